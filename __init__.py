@@ -1,116 +1,56 @@
 """
 ComfyUI 3D查看器插件
 用于在ComfyUI中打开3D模型查看器
+
+导入本包只定义节点类：HTTP 服务器（viewer_server）、图像解码（image_io，依赖 numpy / PIL / torch）
+与网格处理模块都在节点首次执行时才导入，不增加 ComfyUI 的启动时间
 """
 
+import importlib
 import os
-import webbrowser
-import subprocess
-import sys
-from pathlib import Path
-import base64
-import tempfile
 import threading
 import time
 import urllib.parse
-import uuid
-import json
-import functools
-import io
-try:
-    from PIL import Image
-    import numpy as np
-except Exception:
-    Image = None
-    np = None
-try:
-    # Optional extra imaging helper used by the image-loading node
-    from PIL import ImageOps
-except Exception:
-    ImageOps = None
-import comfy
-import re
-import logging
-try:
-    import torch as _torch
-    TORCH_AVAILABLE = True
-except Exception:
-    _torch = None
-    TORCH_AVAILABLE = False
-# expose a name `torch` for compatibility with imported node code
-torch = _torch
-
-# 轻量包装器（当没有 torch 时，提供 .cpu()/.numpy() 接口以兼容 ComfyUI 预览）
-class _NumpyTensorWrapper:
-    def __init__(self, arr):
-        # Ensure we store a numpy array copy to avoid unexpected views
-        try:
-            import numpy as _np_local
-            self._arr = _np_local.array(arr)
-        except Exception:
-            # Fallback: store as-is
-            self._arr = arr
-        self.shape = getattr(self._arr, 'shape', None)
-    def cpu(self):
-        return self
-    def numpy(self):
-        """
-        Return a numpy array in CHW float32 format (channels, height, width)
-        normalized to 0..1 to mimic torch.Tensor.cpu().numpy() behavior.
-        This is the format ComfyUI preview expects when a tensor-like object
-        is provided.
-        """
-        arr = self._arr
-        try:
-            import numpy as _np_local
-        except Exception:
-            return arr
-
-        if arr is None:
-            return arr
-
-        # If HWC color, convert to CHW float32 in 0..1
-        if getattr(arr, 'ndim', None) == 3 and arr.shape[2] >= 3:
-            ch = arr[..., :3].astype(_np_local.float32)
-            # Normalize if integer
-            if arr.dtype.kind in ('u', 'i'):
-                ch = ch / 255.0
-            return _np_local.transpose(ch, (2, 0, 1)).copy()
-
-        # Grayscale HxW -> 1xHxW float32 normalized
-        if getattr(arr, 'ndim', None) == 2:
-            a = arr.astype(_np_local.float32)
-            if arr.dtype.kind in ('u', 'i'):
-                a = a / 255.0
-            return a[np.newaxis, ...].copy()
-
-        # Fallback: attempt to coerce
-        try:
-            coerced = _np_local.array(arr, dtype=_np_local.float32)
-            if coerced.ndim == 3:
-                if coerced.shape[2] == 3:
-                    if coerced.dtype.kind in ('u', 'i'):
-                        coerced = coerced.astype(_np_local.float32) / 255.0
-                    return _np_local.transpose(coerced, (2, 0, 1)).copy()
-            if coerced.ndim == 2:
-                if coerced.dtype.kind in ('u', 'i'):
-                    coerced = coerced.astype(_np_local.float32) / 255.0
-                return coerced[np.newaxis, ...].copy()
-            return coerced
-        except Exception:
-            return arr
-    def to(self, *args, **kwargs):
-        return self
+from pathlib import Path
+
+from .metrics import REGISTRY as _metrics, install_node_profiling, set_profiling  # noqa: F401
 
 # 获取当前插件目录的路径
 PLUGIN_DIR = Path(__file__).parent
 
-# 全局截图注册表：token -> {'event': threading.Event, 'path': str}
-_screenshot_registry = {}
-_screenshot_lock = threading.Lock()
-# 命令队列（短轮询使用）
-_pending_commands = []
-_pending_commands_lock = threading.Lock()
+_metrics.describe('bb3d_load_images_stage_seconds', '🔵BB 加载图像各阶段耗时')
+_metrics.describe('bb3d_load_images_frames_total', '🔵BB 加载图像读取的帧数')
+
+# 按需加载的公开接口：名称 -> 所在子模块（首次访问时才导入该子模块）
+_LAZY_EXPORTS = {
+    'iter_image_batches': 'image_io',
+    'sort_by': 'image_io',
+    'extract_first_number': 'image_io',
+    'IMAGE_EXTENSIONS': 'image_io',
+    'TORCH_AVAILABLE': 'image_io',
+    'get_viewer_sessions': 'viewer_server',
+    'get_endpoint_stats': 'viewer_server',
+    'shutdown_viewer_server': 'viewer_server',
+    'QuietHTTPRequestHandler': 'viewer_server',
+}
+
+
+def __getattr__(name):
+    submodule = _LAZY_EXPORTS.get(name)
+    if submodule is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f".{submodule}", __name__), name)
+
+
+def get_metrics():
+    """
+    返回进程内运行指标快照（与 /metrics 导出的内容相同）
+
+    Returns:
+        dict: {'counters', 'histograms', 'gauges'}，见 MetricsRegistry.snapshot()
+    """
+    return _metrics.snapshot()
+
 
 class Open3DViewer:
     """
@@ -129,6 +69,7 @@ class Open3DViewer:
                 "viewer_path": ("STRING", {"default": ""}),
                 "auto_open": ("BOOLEAN", {"default": True}),
                 "port": ("INT", {"default": 8001, "min": 1000, "max": 9999}),
+                "model_path": ("STRING", {"default": ""}),
             }
         }
 
@@ -137,7 +78,7 @@ class Open3DViewer:
     FUNCTION = "open_viewer"
     CATEGORY = "🔵BB 3D查看器"
 
-    def open_viewer(self, viewer_file, viewer_path="", auto_open=True, port=8001):
+    def open_viewer(self, viewer_file, viewer_path="", auto_open=True, port=8001, model_path=""):
         """
         打开3D查看器
 
@@ -146,6 +87,7 @@ class Open3DViewer:
             viewer_path: 查看器文件的完整路径（可选，如果为空则自动查找）
             auto_open: 是否自动打开浏览器
             port: HTTP服务器端口
+            model_path: 打开后自动加载的模型文件路径（可选，通过 /models 接口按 URL 流式加载）
 
         Returns:
             status: 操作状态信息
@@ -189,184 +131,48 @@ class Open3DViewer:
                     ]
                     return (f"错误：找不到文件 {viewer_file}。尝试的路径：{' | '.join(possible_paths)}",)
 
-            # 启动本地HTTP服务器
-            import http.server
-            import socketserver
-            import threading
-            import json as _json
-            import base64 as _base64
-            import tempfile as _tempfile
-            import urllib.parse as _urllib_parse
-
-            class QuietHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
-                def log_message(self, format, *args):
-                    pass  # 静默日志
-                def do_GET(self):
-                    # 支持 /next_command 用于前端轮询获取下一个 token
-                    parsed = _urllib_parse.urlparse(self.path)
-                    if parsed.path != '/next_command':
-                        return super().do_GET()
-                    qs = _urllib_parse.parse_qs(parsed.query)
-                    # 可以基于 viewer 参数做更复杂的路由，目前简单 FIFO
-                    token = None
-                    with _pending_commands_lock:
-                        if _pending_commands:
-                            token = _pending_commands.pop(0)
-                    self.send_response(200)
-                    self.send_header('Content-Type', 'application/json')
-                    self.end_headers()
-                    if token:
-                        self.wfile.write(_json.dumps({'token': token}).encode('utf-8'))
-                    else:
-                        self.wfile.write(_json.dumps({}).encode('utf-8'))
-                    return
-                def do_POST(self):
-                    # 仅处理 /upload_screenshot
-                    parsed = _urllib_parse.urlparse(self.path)
-                    if parsed.path != '/upload_screenshot':
-                        self.send_response(404)
-                        self.end_headers()
-                        return
-                    qs = _urllib_parse.parse_qs(parsed.query)
-                    token = qs.get('token', [''])[0]
-                    try:
-                        length = int(self.headers.get('Content-Length', 0))
-                    except Exception:
-                        length = 0
-                    body = self.rfile.read(length).decode('utf-8', errors='ignore')
-                    dataurl = None
-                    try:
-                        j = _json.loads(body)
-                        dataurl = j.get('dataUrl') or j.get('dataurl') or j.get('data')
-                    except Exception:
-                        dataurl = body.strip()
-                    if not dataurl:
-                        self.send_response(400)
-                        self.end_headers()
-                        return
-                    # data:image/png;base64,...
-                    if dataurl.startswith('data:image'):
-                        try:
-                            _, b64 = dataurl.split(',', 1)
-                            data = _base64.b64decode(b64)
-                            # 将上传保存为固定文件 image.png（先写临时文件再原子替换）
-                            tmpf = _tempfile.NamedTemporaryFile(delete=False, suffix='.png', dir=str(PLUGIN_DIR))
-                            try:
-                                tmpf.write(data)
-                                tmpf.flush()
-                                tmpf.close()
-                                target_path = PLUGIN_DIR / 'image.png'
-                                try:
-                                    # 原子替换（Windows/Unix 都支持）
-                                    os.replace(tmpf.name, str(target_path))
-                                except Exception:
-                                    # 备用方案
-                                    try:
-                                        import shutil as _shutil
-                                        _shutil.move(tmpf.name, str(target_path))
-                                    except Exception:
-                                        # 如果移动失败，尽量清理并报错
-                                        try:
-                                            os.unlink(tmpf.name)
-                                        except Exception:
-                                            pass
-                                        raise
-                                path = str(target_path)
-                            except Exception as _write_err:
-                                # 清理临时文件（如果存在）并返回错误
-                                try:
-                                    if tmpf and hasattr(tmpf, 'name') and os.path.exists(tmpf.name):
-                                        os.unlink(tmpf.name)
-                                except Exception:
-                                    pass
-                                try:
-                                    self.send_response(500)
-                                    self.end_headers()
-                                    self.wfile.write(str(_write_err).encode('utf-8', errors='ignore'))
-                                except Exception:
-                                    pass
-                                return
-                            # 注册结果并触发等待事件（如果存在）
-                            with _screenshot_lock:
-                                entry = _screenshot_registry.get(token)
-                                if not entry:
-                                    entry = {}
-                                    _screenshot_registry[token] = entry
-                                entry['path'] = path
-                                ev = entry.get('event')
-                                if ev:
-                                    ev.set()
-                            try:
-                                self.send_response(200)
-                                self.end_headers()
-                                self.wfile.write(b'OK')
-                            except Exception:
-                                pass
-                            print(f"[3DViewer DEBUG] Saved uploaded screenshot to {path}")
-                            return
-                        except Exception as e:
-                            try:
-                                self.send_response(500)
-                                self.end_headers()
-                                self.wfile.write(str(e).encode('utf-8', errors='ignore'))
-                            except Exception:
-                                pass
-                            return
-                    else:
-                        self.send_response(400)
-                        self.end_headers()
-                        return
+            from .viewer_server import _ensure_viewer_server, _model_url, missing_vendor_assets
 
-            # 切换到文件所在目录
-            os.chdir(viewer_full_path.parent)
-
-            # 创建HTTP服务器并在后台线程中持续运行
+            # 启动（或复用）该端口上的服务器，静态文件直接从查看器所在目录提供
             try:
-                httpd = socketserver.TCPServer(("", port), QuietHTTPRequestHandler)
+                _, started = _ensure_viewer_server(port, viewer_full_path.parent)
             except OSError as e:
                 return (f"错误：无法绑定端口 {port}（可能被占用）：{e}",)
 
             server_url = f"http://localhost:{port}/{viewer_full_path.name}"
+            if model_path:
+                if not os.path.isfile(model_path):
+                    return (f"错误：找不到模型文件 {model_path}",)
+                server_url += "?model=" + urllib.parse.quote(_model_url(model_path), safe='')
 
             # 在新线程中打开浏览器，避免阻塞（延迟以确保服务器已启动）
             if auto_open:
                 def open_browser():
-                    import time
-                    time.sleep(0.5)
+                    import webbrowser
+                    time.sleep(0.5 if started else 0)
                     try:
                         webbrowser.open(server_url)
                     except Exception:
                         pass
                 threading.Thread(target=open_browser, daemon=True).start()
 
-            # 启动服务器的后台线程（守护线程，随进程退出）
-            server_thread = threading.Thread(target=httpd.serve_forever, daemon=True)
-            server_thread.start()
-
-            # 保存引用以便将来可能需要停止服务器
-            try:
-                self._viewer_httpd = httpd
-                self._viewer_thread = server_thread
-            except Exception:
-                # 如果没有 self（极小概率），忽略
-                pass
-
-            print(f"3D查看器已启动: {server_url}")
-            return (f"3D查看器已启动: {server_url}",)
+            status = f"3D查看器已启动: {server_url}"
+            missing = missing_vendor_assets()
+            if missing:
+                status += (f"\nℹ️ 查看器从 CDN 加载 three.js（需要联网）；vendor/ 中缺少 {len(missing)} 个本地副本，"
+                           f"需要离线使用时运行 python vendor_assets.py 下载")
+            print(status)
+            return (status,)
 
         except Exception as e:
             error_msg = f"打开3D查看器失败: {str(e)}"
             print(error_msg)
             return (error_msg,)
 
+
 #
 # 以下为从原始 `imaaaa.py` 合并过来的图像读取节点（Read images from directory）
 #
-def extract_first_number(s):
-    match = re.search(r'\d+', s)
-    return int(match.group()) if match else float('inf')
-
-
 sort_methods = [
     "None",
     "Alphabetical (ASC)",
@@ -378,38 +184,6 @@ sort_methods = [
 ]
 
 
-def sort_by(items, base_path='.', method=None):
-    def fullpath(x): return os.path.join(base_path, x)
-
-    def get_timestamp(path):
-        try:
-            return os.path.getmtime(path)
-        except FileNotFoundError:
-            return float('-inf')
-
-    if method == "Alphabetical (ASC)":
-        return sorted(items)
-    elif method == "Alphabetical (DESC)":
-        return sorted(items, reverse=True)
-    elif method == "Numerical (ASC)":
-        return sorted(items, key=lambda x: extract_first_number(os.path.splitext(x)[0]))
-    elif method == "Numerical (DESC)":
-        return sorted(items, key=lambda x: extract_first_number(os.path.splitext(x)[0]), reverse=True)
-    elif method == "Datetime (ASC)":
-        return sorted(items, key=lambda x: get_timestamp(fullpath(x)))
-    elif method == "Datetime (DESC)":
-        return sorted(items, key=lambda x: get_timestamp(fullpath(x)), reverse=True)
-    else:
-        return items
-
-
-try:
-    import pillow_jxl  # noqa: F401
-    jxl = True
-except Exception:
-    jxl = False
-
-
 class imaaaa:
     @classmethod
     def INPUT_TYPES(s):
@@ -421,10 +195,18 @@ class imaaaa:
                 "image_load_cap": ("INT", {"default": 0, "min": 0, "step": 1}),
                 "start_index": ("INT", {"default": 0, "min": -1, "max": 0xffffffffffffffff, "step": 1}),
                 "load_always": ("BOOLEAN", {"default": False, "label_on": "enabled", "label_off": "disabled"}),
+                "decode_workers": ("INT", {"default": 0, "min": 0, "max": 64, "step": 1}),
+                "frame_cache": ("BOOLEAN", {"default": False, "label_on": "enabled", "label_off": "disabled"}),
+                "sort_method": (sort_methods, {"default": "None"}),
+                # 以 uint8 解码与缓存帧（内存与缓存文件为 float32 的 1/4），输出时才一次性转换为 float32 IMAGE
+                "compact_storage": ("BOOLEAN", {"default": False, "label_on": "enabled", "label_off": "disabled"}),
+                # 输出帧最长边上限（0 为保持首帧尺寸）：大图 JPEG 以 1/2~1/8 缩小解码，再整数倍缩小后缩放到目标尺寸
+                "target_size": ("INT", {"default": 0, "min": 0, "max": 16384, "step": 8}),
             }
         }
 
-    RETURN_TYPES = ("IMAGE",)
+    RETURN_TYPES = ("IMAGE", "MASK")
+    RETURN_NAMES = ("image", "mask")
     FUNCTION = "load_images"
     CATEGORY = "🔵BB 3D查看器"
 
@@ -433,135 +215,272 @@ class imaaaa:
         if 'load_always' in kwargs and kwargs['load_always']:
             return float("NaN")
         else:
-            return hash(frozenset(kwargs))
-
-    def load_images(self, directory: str, image_load_cap: int = 0, start_index: int = 0, load_always=False):
-        if not os.path.isdir(directory):
-            raise FileNotFoundError(f"Directory '{directory} cannot be found.'")
-        dir_files = os.listdir(directory)
-        if len(dir_files) == 0:
-            raise FileNotFoundError(f"No files in directory '{directory}'.")
-
-        # Filter files by extension
-        valid_extensions = ['.jpg', '.jpeg', '.png', '.webp']
-        if jxl:
-            valid_extensions.extend('.jxl')
-        dir_files = [f for f in dir_files if any(f.lower().endswith(ext) for ext in valid_extensions)]
-
-        dir_files = sort_by(dir_files, directory)
-        dir_files = [os.path.join(directory, x) for x in dir_files]
-
-        # start at start_index
-        dir_files = dir_files[start_index:]
-
-        images = []
-        masks = []
-
-        limit_images = False
-        if image_load_cap > 0:
-            limit_images = True
-        image_count = 0
-
-        has_non_empty_mask = False
-
-        for image_path in dir_files:
-            if os.path.isdir(image_path) and os.path.ex:
-                continue
-            if limit_images and image_count >= image_load_cap:
-                break
-            i = Image.open(image_path)
-            # Ensure orientation is correct if available
-            if ImageOps is not None:
-                try:
-                    i = ImageOps.exif_transpose(i)
-                except Exception:
-                    pass
-            image = i.convert("RGB")
-            image = np.array(image).astype(np.float32) / 255.0
-            # If torch is available use it, otherwise wrap numpy to keep compatibility
-            if torch is not None:
-                image = torch.from_numpy(image)[None,]
-            else:
-                image = _NumpyTensorWrapper(image)
-            if 'A' in i.getbands():
-                mask = np.array(i.getchannel('A')).astype(np.float32) / 255.0
-                if torch is not None:
-                    mask = 1. - torch.from_numpy(mask)
-                else:
-                    mask = 1. - mask
-                has_non_empty_mask = True
-            else:
-                if torch is not None:
-                    mask = torch.zeros((64, 64), dtype=torch.float32, device="cpu")
-                else:
-                    mask = np.zeros((64, 64), dtype=np.float32)
-            images.append(image)
-            masks.append(mask)
-            image_count += 1
-
-        if len(images) == 1:
-            return (images[0],)
-
-        elif len(images) > 1:
-            image1 = images[0]
-            mask1 = None
-
-            for image2 in images[1:]:
-                # If torch is available, ensure tensors have compatible shapes and use comfy upscale
-                try:
-                    if hasattr(image1, 'shape') and hasattr(image2, 'shape') and image1.shape[1:] != image2.shape[1:]:
-                        image2 = comfy.utils.common_upscale(image2.movedim(-1, 1), image1.shape[2], image1.shape[1], "bilinear", "center").movedim(1, -1)
-                except Exception:
-                    pass
-                # Concatenate along batch dimension if torch available
-                if torch is not None:
-                    image1 = torch.cat((image1, image2), dim=0)
-                else:
-                    # Fallback: stack numpy arrays
-                    image1 = np.concatenate((image1, image2), axis=0)
+            # 参数 + 目录列表指纹：文件增删或内容修改（mtime/大小变化）都会触发重新执行
+            from .image_io import _directory_fingerprint
+            params = repr(sorted(kwargs.items()))
+            return f"{params}:{_directory_fingerprint(kwargs.get('directory', ''))}"
+
+    def load_images(self, directory: str, image_load_cap: int = 0, start_index: int = 0, load_always=False, decode_workers: int = 0, frame_cache=False, sort_method="None", compact_storage=False, target_size: int = 0):
+        from .image_io import (
+            _as_image_output, _as_mask_output, _decode_image_batch, _frame_cache, _get_directory_index,
+            _select_image_files, _storage_dtype, _target_frame_size,
+        )
+
+        # 各阶段耗时记录到 bb3d_load_images_stage_seconds{stage=...}
+        # （帧直接解码进预分配批次，不再有单独的拼接阶段）
+        stage = 'bb3d_load_images_stage_seconds'
+        with _metrics.timer(stage, stage='listdir'):
+            if os.path.isdir(directory):
+                _get_directory_index(directory).refresh()
+        with _metrics.timer(stage, stage='sort'):
+            dir_files = _select_image_files(directory, start_index, image_load_cap, sort_method)
+
+        # 并行解码到预分配缓冲区（保持 sort_by 决定的顺序）
+        with _metrics.timer(stage, stage='decode'):
+            size = _target_frame_size(dir_files[0], target_size)
+            images, masks = _decode_image_batch(dir_files, decode_workers, _frame_cache if frame_cache else None, size,
+                                                dtype=_storage_dtype(compact_storage), reduce=target_size > 0)
+
+        with _metrics.timer(stage, stage='convert'):
+            image1 = _as_image_output(images)
+            mask1 = _as_mask_output(masks, len(dir_files))
+        _metrics.inc('bb3d_load_images_frames_total', len(dir_files))
+
+        return (image1, mask1)
 
-            for mask2 in masks:
-                if has_non_empty_mask:
-                    try:
-                        if torch is not None:
-                            if image1.shape[1:3] != mask2.shape:
-                                mask2 = torch.nn.functional.interpolate(mask2.unsqueeze(0).unsqueeze(0), size=(image1.shape[1], image1.shape[2]), mode='bilinear', align_corners=False)
-                                mask2 = mask2.squeeze(0)
-                            else:
-                                mask2 = mask2.unsqueeze(0)
-                        else:
-                            # numpy fallback: expand dims
-                            mask2 = np.expand_dims(mask2, 0)
-                    except Exception:
-                        mask2 = np.expand_dims(mask2, 0)
-                else:
-                    if torch is not None:
-                        mask2 = mask2.unsqueeze(0)
-                    else:
-                        mask2 = np.expand_dims(mask2, 0)
 
-                if mask1 is None:
-                    mask1 = mask2
-                else:
-                    if torch is not None:
-                        mask1 = torch.cat((mask1, mask2), dim=0)
-                    else:
-                        mask1 = np.concatenate((mask1, mask2), axis=0)
+#
+# 截图节点：让已打开的查看器渲染并上传截图，直接在内存中解码为 IMAGE
+#
+class CaptureViewerImage:
+    """
+    从已打开的3D查看器截取当前画面（截屏框区域）并返回 IMAGE
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {},
+            "optional": {
+                "timeout": ("FLOAT", {"default": 30.0, "min": 1.0, "max": 600.0, "step": 1.0}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE",)
+    FUNCTION = "capture"
+    CATEGORY = "🔵BB 3D查看器"
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        # 查看器画面随时可能变化，每次都重新截图
+        return float("NaN")
 
-            return (image1,)
+    def capture(self, timeout=30.0):
+        from .image_io import _as_image_output
+        from .viewer_server import _capture_viewer_images
+        images = _capture_viewer_images([None], timeout)
+        return (_as_image_output(images),)
+
+
+class CaptureViewerOrbit:
+    """
+    围绕当前观察中心按等间隔方位角环绕截图，返回 N 帧 IMAGE 批次
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "views": ("INT", {"default": 8, "min": 1, "max": 360, "step": 1}),
+            },
+            "optional": {
+                "elevation": ("FLOAT", {"default": 15.0, "min": -89.0, "max": 89.0, "step": 0.5}),
+                "start_azimuth": ("FLOAT", {"default": 0.0, "min": -360.0, "max": 360.0, "step": 0.5}),
+                "timeout": ("FLOAT", {"default": 120.0, "min": 1.0, "max": 3600.0, "step": 1.0}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE",)
+    FUNCTION = "capture"
+    CATEGORY = "🔵BB 3D查看器"
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        return float("NaN")
+
+    def capture(self, views, elevation=15.0, start_azimuth=0.0, timeout=120.0):
+        from .image_io import _as_image_output
+        from .viewer_server import _capture_viewer_images
+        cameras = [
+            {'azimuth': (start_azimuth + k * 360.0 / views) % 360.0, 'elevation': elevation}
+            for k in range(views)
+        ]
+        images = _capture_viewer_images(cameras, timeout)
+        return (_as_image_output(images),)
+
+
+class CaptureViewerSequence:
+    """
+    序列截图：查看器沿环绕路径连续渲染 N 帧，以原始 RGBA 或 WebP 在一次上传中回传，
+    服务器边接收边写入预分配的 IMAGE 批次
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        from .sequence_format import SEQUENCE_FORMATS, SEQUENCE_MAX_FRAMES
+        return {
+            "required": {
+                "frames": ("INT", {"default": 36, "min": 1, "max": SEQUENCE_MAX_FRAMES, "step": 1}),
+            },
+            "optional": {
+                "elevation": ("FLOAT", {"default": 15.0, "min": -89.0, "max": 89.0, "step": 0.5}),
+                "start_azimuth": ("FLOAT", {"default": 0.0, "min": -360.0, "max": 360.0, "step": 0.5}),
+                # 环绕的总角度；360 时最后一帧不与第一帧重复
+                "sweep": ("FLOAT", {"default": 360.0, "min": -3600.0, "max": 3600.0, "step": 1.0}),
+                "format": (list(SEQUENCE_FORMATS),),
+                "timeout": ("FLOAT", {"default": 300.0, "min": 1.0, "max": 3600.0, "step": 1.0}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE",)
+    FUNCTION = "capture"
+    CATEGORY = "🔵BB 3D查看器"
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        return float("NaN")
+
+    def capture(self, frames, elevation=15.0, start_azimuth=0.0, sweep=360.0, format="raw", timeout=300.0):
+        from .image_io import _as_image_output
+        from .viewer_server import _capture_viewer_sequence
+        closed = abs(sweep) % 360.0 == 0 and sweep != 0
+        step = sweep / frames if closed or frames == 1 else sweep / (frames - 1)
+        cameras = [
+            {'azimuth': (start_azimuth + k * step) % 360.0, 'elevation': elevation}
+            for k in range(frames)
+        ]
+        images = _capture_viewer_sequence(cameras, format, timeout)
+        return (_as_image_output(images),)
+
+
+class LoadMesh:
+    """
+    读取 OBJ / STL / PLY 网格为 BB_MESH（顶点与三角形数组，与 ComfyUI 内置的 MESH 类型不兼容），可选推送到已打开的查看器
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "mesh_path": ("STRING", {"default": "", "multiline": False}),
+            },
+            "optional": {
+                "weld": ("BOOLEAN", {"default": True}),
+                "push_to_viewer": ("BOOLEAN", {"default": False}),
+            }
+        }
+
+    RETURN_TYPES = ("BB_MESH", "STRING")
+    RETURN_NAMES = ("mesh", "info")
+    FUNCTION = "load_mesh"
+    CATEGORY = "🔵BB 3D查看器"
+
+    @classmethod
+    def IS_CHANGED(cls, mesh_path, **kwargs):
+        try:
+            st = os.stat(mesh_path.strip().strip('"'))
+            return f"{mesh_path}:{st.st_mtime_ns}:{st.st_size}:{sorted(kwargs.items())}"
+        except OSError:
+            return float("NaN")
+
+    def load_mesh(self, mesh_path, weld=True, push_to_viewer=False):
+        from .mesh_io import load_mesh
+        path = mesh_path.strip().strip('"')
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"网格文件不存在: {path}")
+        mesh = load_mesh(path, weld=weld)
+        lo, hi = mesh.bounds
+        info = (f"{os.path.basename(path)}: {mesh.num_vertices} 个顶点, {mesh.num_faces} 个三角形, "
+                f"包围盒 {[round(v, 4) for v in lo.tolist()]} - {[round(v, 4) for v in hi.tolist()]}")
+        if push_to_viewer:
+            from .viewer_server import _push_mesh_to_viewer
+            url = _push_mesh_to_viewer(mesh, os.path.splitext(os.path.basename(path))[0] + '.glb')
+            info += f"\n已推送到查看器: {url}"
+        return (mesh, info)
+
+
+class RenderMeshOrbit:
+    """
+    不依赖浏览器的 CPU 环绕渲染：按 🔵BB 环绕截图 相同的相机约定渲染 N 个视角，返回 IMAGE 批次
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "mesh": ("BB_MESH",),
+                "views": ("INT", {"default": 8, "min": 1, "max": 360, "step": 1}),
+            },
+            "optional": {
+                "elevation": ("FLOAT", {"default": 15.0, "min": -89.0, "max": 89.0, "step": 0.5}),
+                "start_azimuth": ("FLOAT", {"default": 0.0, "min": -360.0, "max": 360.0, "step": 0.5}),
+                # 距离以 modelTargetSize（模型最长边）为单位，与查看器的景别划分一致
+                "distance": ("FLOAT", {"default": 2.0, "min": 0.2, "max": 100.0, "step": 0.1}),
+                "fov": ("FLOAT", {"default": 75.0, "min": 10.0, "max": 120.0, "step": 0.5}),
+                "width": ("INT", {"default": 512, "min": 16, "max": 4096, "step": 8}),
+                "height": ("INT", {"default": 512, "min": 16, "max": 4096, "step": 8}),
+                "shading": (["phong", "lambert"],),
+                "color": ("STRING", {"default": "#cccccc"}),
+                "background": ("STRING", {"default": "#ffffff"}),
+                "workers": ("INT", {"default": 0, "min": 0, "max": 64, "step": 1}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE",)
+    FUNCTION = "render"
+    CATEGORY = "🔵BB 3D查看器"
+
+    def render(self, mesh, views, elevation=15.0, start_azimuth=0.0, distance=2.0, fov=75.0,
+               width=512, height=512, shading="phong", color="#cccccc", background="#ffffff", workers=0):
+        import numpy as np
+        from . import mesh_render
+        from .image_io import _as_image_output
+        vertices = mesh_render.normalize_to_viewer(mesh.vertices)
+        cameras = [
+            mesh_render.orbit_eye((start_azimuth + k * 360.0 / views) % 360.0, elevation, distance)
+            for k in range(views)
+        ]
+        frames = mesh_render.render_orbit(
+            vertices, mesh.faces, mesh.vertex_normals, cameras, workers=workers,
+            fov=fov, width=width, height=height, shading=shading,
+            color=mesh_render.parse_color(color, (0.8, 0.8, 0.8)),
+            background=mesh_render.parse_color(background),
+        )
+        print(f"环绕渲染完成: {views} 个视角, {width}x{height}, 景别 {mesh_render.shot_scale(distance)}")
+        images = np.empty(frames.shape, dtype=np.float32)
+        np.multiply(frames, 1.0 / 255.0, out=images)
+        return (_as_image_output(images),)
 
 
 # 注册节点（包含已有的 Open3DViewer 与新合并的 imaaaa 读取节点）
 NODE_CLASS_MAPPINGS = {
     "Open3DViewer": Open3DViewer,
     "🔵BB 读取图像 //Inspire": imaaaa,
+    "CaptureViewerImage": CaptureViewerImage,
+    "CaptureViewerOrbit": CaptureViewerOrbit,
+    "CaptureViewerSequence": CaptureViewerSequence,
+    "LoadMesh": LoadMesh,
+    "RenderMeshOrbit": RenderMeshOrbit,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "Open3DViewer": "🔵BB 打开3D查看器",
     "🔵BB 读取图像 //Inspire": "🔵BB 读取图像",
+    "CaptureViewerImage": "🔵BB 截取查看器图像",
+    "CaptureViewerOrbit": "🔵BB 环绕截图",
+    "CaptureViewerSequence": "🔵BB 序列截图",
+    "LoadMesh": "🔵BB 读取网格",
+    "RenderMeshOrbit": "🔵BB 网格环绕渲染",
 }
 
+# 节点剖析：BB3D_PROFILE=imaaaa,LoadMesh（或 all）时把 cProfile / tracemalloc 结果写入 cache/profiles/
+install_node_profiling(NODE_CLASS_MAPPINGS)
+
 # 插件信息
 __version__ = "1.1.0"
 __description__ = "ComfyUI 3D模型查看器插件（含图像目录读取节点）"
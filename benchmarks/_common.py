@@ -0,0 +1,55 @@
+"""
+基准测试脚本的公共工具：按 ComfyUI 的方式加载插件包、生成合成图像目录
+"""
+
+import importlib.util
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+PLUGIN_DIR = Path(__file__).resolve().parent.parent
+PACKAGE_NAME = "ComfyUI_3DViewer"
+
+
+def load_plugin():
+    """以包的形式导入插件（ComfyUI 根目录需在 custom_nodes 的上一级，以便导入 comfy）"""
+    if PACKAGE_NAME in sys.modules:
+        return sys.modules[PACKAGE_NAME]
+    comfy_root = str(PLUGIN_DIR.parent.parent)
+    if comfy_root not in sys.path:
+        sys.path.append(comfy_root)
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE_NAME, PLUGIN_DIR / "__init__.py", submodule_search_locations=[str(PLUGIN_DIR)]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE_NAME] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_submodule(name):
+    """导入插件的子模块（如 image_io、viewer_server；插件包按需加载它们）"""
+    import importlib
+    load_plugin()
+    return importlib.import_module(f"{PACKAGE_NAME}.{name}")
+
+
+def make_image_dir(count, width=256, height=256, fmt="png", root=None):
+    """生成包含 count 张合成图像的临时目录，返回目录路径"""
+    from PIL import Image
+    import numpy as np
+
+    directory = tempfile.mkdtemp(prefix="bb3d_bench_", dir=root)
+    rng = np.random.default_rng(count)
+    # 每张图内容不同，但只生成一张噪声底图，避免生成阶段过慢
+    base = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    for k in range(count):
+        frame = np.roll(base, k, axis=1)
+        Image.fromarray(frame).save(os.path.join(directory, f"frame_{k:05d}.{fmt}"))
+    return directory
+
+
+def remove_dir(directory):
+    import shutil
+    shutil.rmtree(directory, ignore_errors=True)
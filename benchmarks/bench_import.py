@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+插件导入耗时基准：在全新的解释器中用 python -X importtime 导入插件包，统计插件本身给 ComfyUI 启动增加的时间
+
+用法: python benchmarks/bench_import.py [--repeat 10] [--preload numpy torch PIL] [--budget-ms 10]
+字节码缓存（__pycache__）与 ComfyUI 中一样会被复用；每次运行先导入 --preload 中的模块（模拟 ComfyUI 启动时已加载的依赖，默认不预加载，即最坏情况），
+再计时导入插件包；输出各次的中位数、导入期间新加载的最重模块，超过 --budget-ms 时以退出码 1 结束。
+随后与 ComfyUI 启动时一样对每个节点调用 INPUT_TYPES()，检查此时已加载的插件子模块：
+查看器服务器、图像与网格模块应推迟到节点第一次执行时才导入，否则同样以退出码 1 结束
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+from _common import PLUGIN_DIR
+
+MARKER = "bb3d-import-start"
+
+CHILD = r"""
+import importlib, sys, time
+sys.path.insert(0, {benchmarks!r})
+for name in {preload!r}:
+    try:
+        importlib.import_module(name)
+    except Exception:
+        pass
+from _common import load_plugin
+print({marker!r}, file=sys.stderr, flush=True)
+start = time.perf_counter()
+plugin = load_plugin()
+elapsed = (time.perf_counter() - start) * 1000
+for node in plugin.NODE_CLASS_MAPPINGS.values():
+    node.INPUT_TYPES()
+print(elapsed)
+print(",".join(sorted(m for m in sys.modules if m.startswith(plugin.__name__ + "."))))
+"""
+
+# 这些子模块较重（numpy / PIL / 服务器线程），不应在注册节点或生成节点界面时加载
+LAZY_SUBMODULES = ("viewer_server", "image_io", "mesh_io", "mesh_optimize", "mesh_render")
+
+
+def run_once(preload):
+    code = CHILD.format(benchmarks=str(PLUGIN_DIR / "benchmarks"), preload=list(preload), marker=MARKER)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    out = proc.stdout.strip().splitlines()
+    elapsed_ms = float(out[-2])
+    submodules = [m.rsplit(".", 1)[-1] for m in out[-1].split(",") if m]
+    # importtime 行格式: "import time: self [us] | cumulative | imported package"，只统计插件导入期间的顶层模块
+    modules = []
+    lines = proc.stderr.splitlines()
+    for line in lines[lines.index(MARKER) + 1:]:
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if cumulative.strip().isdigit() and not name[1:].startswith(" "):
+            modules.append((int(cumulative) / 1000.0, name.strip()))
+    return elapsed_ms, modules, submodules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--preload", nargs="*", default=[])
+    parser.add_argument("--budget-ms", type=float, default=10.0)
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    runs = [run_once(args.preload) for _ in range(args.repeat)]
+    times = [t for t, _, _ in runs]
+    median = statistics.median(times)
+    print(f"预加载: {' '.join(args.preload) or '(无)'}")
+    print(f"插件导入耗时: 中位数 {median:.2f} ms, 最快 {min(times):.2f} ms, 最慢 {max(times):.2f} ms（{args.repeat} 次）")
+    print("导入期间新加载的顶层模块（最后一次运行，累计 ms）:")
+    for ms, name in sorted(runs[-1][1], reverse=True)[:args.top]:
+        print(f"  {ms:>8.2f}  {name}")
+    submodules = runs[-1][2]
+    print(f"INPUT_TYPES 之后已加载的插件子模块: {', '.join(submodules) or '(无)'}")
+    failed = False
+    eager = [m for m in submodules if m in LAZY_SUBMODULES]
+    if eager:
+        print(f"应延迟导入的子模块被提前加载: {', '.join(eager)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"超过预算 {args.budget_ms:.1f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+imaaaa.load_images 批量合并基准：逐帧 concat（旧实现）与预分配缓冲区（新实现）对比
+
+用法: python benchmarks/bench_load_images.py [--sizes 10 100 1000] [--resolution 256]
+输出每个 N 下的耗时与峰值内存（tracemalloc 统计 numpy 分配）。
+新实现直接测量 _decode_image_batch，即 torch 路径下 load_images 的全部分配（torch.from_numpy 零拷贝）
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+
+import numpy as np
+
+from _common import load_submodule, make_image_dir, remove_dir
+
+
+def concat_reference(image_io, paths):
+    """旧实现：逐帧解码为 float32 后反复 np.concatenate"""
+    batch = None
+    for path in paths:
+        with image_io.Image.open(path) as i:
+            frame = np.array(i.convert("RGB")).astype(np.float32)[None, ...] / 255.0
+        batch = frame if batch is None else np.concatenate((batch, frame), axis=0)
+    return batch
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--resolution", type=int, default=256)
+    args = parser.parse_args()
+
+    image_io = load_submodule("image_io")
+    print(f"{'N':>6} {'concat s':>10} {'concat MB':>10} {'prealloc s':>11} {'prealloc MB':>12}")
+    for n in args.sizes:
+        directory = make_image_dir(n, args.resolution, args.resolution)
+        try:
+            paths = sorted(os.path.join(directory, f) for f in os.listdir(directory))
+            old_t, old_peak = measure(lambda: concat_reference(image_io, paths))
+            new_t, new_peak = measure(lambda: image_io._decode_image_batch(paths, decode_workers=1))
+            print(f"{n:>6} {old_t:>10.3f} {old_peak / 2**20:>10.1f} {new_t:>11.3f} {new_peak / 2**20:>12.1f}")
+        finally:
+            remove_dir(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+CPU 环绕渲染基准：不同三角形数下每秒渲染的视角数
+
+用法: python benchmarks/bench_render.py [--triangles 10000 100000 1000000] [--views 8] [--resolution 512] [--workers 0]
+网格为程序生成的 UV 球面；workers=0 自动（CPU 数），1 为单线程；设置 BB3D_RENDER_PROCESSES=1 测量进程池
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from _common import load_plugin
+
+
+def uv_sphere(triangles):
+    """生成约 triangles 个三角形的 UV 球面 (vertices, faces)"""
+    rings = max(3, int(np.sqrt(triangles / 4)))
+    segments = 2 * rings
+    theta = np.linspace(0, np.pi, rings + 1)
+    phi = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    t, p = np.meshgrid(theta, phi, indexing="ij")
+    vertices = np.stack([np.sin(t) * np.cos(p), np.cos(t), np.sin(t) * np.sin(p)], axis=-1).reshape(-1, 3)
+    i = np.arange(rings)[:, None]
+    j = np.arange(segments)[None, :]
+    j1 = (j + 1) % segments
+    a, b = i * segments + j, (i + 1) * segments + j
+    c, d = (i + 1) * segments + j1, i * segments + j1
+    faces = np.concatenate([np.stack([a, b, c], -1).reshape(-1, 3), np.stack([a, c, d], -1).reshape(-1, 3)])
+    return vertices.astype(np.float32), faces.astype(np.int32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--triangles", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--views", type=int, default=8)
+    parser.add_argument("--resolution", type=int, default=512)
+    parser.add_argument("--workers", type=int, default=0)
+    args = parser.parse_args()
+
+    plugin = load_plugin()
+    from ComfyUI_3DViewer import mesh_io
+
+    print(f"{'triangles':>10} {'views':>6} {'seconds':>9} {'views/s':>9}")
+    for count in args.triangles:
+        vertices, faces = uv_sphere(count)
+        mesh = mesh_io.Mesh(vertices, faces)
+        node = plugin.RenderMeshOrbit()
+        start = time.perf_counter()
+        node.render(mesh, args.views, width=args.resolution, height=args.resolution, workers=args.workers)
+        elapsed = time.perf_counter() - start
+        print(f"{mesh.num_faces:>10} {args.views:>6} {elapsed:>9.3f} {args.views / elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+序列截图吞吐基准：逐帧截图（每帧一次 PNG 编码 + 一次 /upload_screenshot 请求 + 解码）
+与序列截图（全部帧一次 /upload_sequence 请求，raw RGBA 或 WebP，服务器边收边写入预分配批次）对比
+
+用法: python benchmarks/bench_sequence.py [--frames 72] [--resolution 512]
+浏览器端的编码用 PIL 模拟（PNG compress_level=6 接近 canvas.toBlob），只统计服务器与传输部分，
+不包含 WebGL 渲染本身；输出每种方式的总耗时与帧/秒
+"""
+
+import argparse
+import http.client
+import io
+import socket
+import struct
+import time
+import uuid
+
+import numpy as np
+
+from _common import load_plugin, load_submodule
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def synthetic_frames(count, size):
+    """平滑渐变 + 少量噪声，压缩率接近真实渲染画面"""
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    rng = np.random.default_rng(0)
+    frames = []
+    for k in range(count):
+        phase = k / count
+        rgb = np.stack([x, y, (x + y + phase) % 1.0], axis=-1) * 255
+        rgb += rng.normal(0, 2, rgb.shape)
+        frames.append(np.clip(rgb, 0, 255).astype(np.uint8))
+    return frames
+
+
+def encode(frame, fmt):
+    from PIL import Image
+    buf = io.BytesIO()
+    if fmt == "PNG":
+        Image.fromarray(frame).save(buf, format="PNG", compress_level=6)
+    else:
+        Image.fromarray(frame).save(buf, format="WEBP", quality=90)
+    return buf.getvalue()
+
+
+def per_frame(server, conn, frames):
+    tokens = [uuid.uuid4().hex for _ in frames]
+    for token in tokens:
+        server._screenshot_store.expect(token)
+    start = time.perf_counter()
+    datas = []
+    for token, frame in zip(tokens, frames):
+        conn.request("POST", f"/upload_screenshot?token={token}", body=encode(frame, "PNG"),
+                     headers={"Content-Type": "image/png"})
+        conn.getresponse().read()
+        datas.append(server._screenshot_store.wait(token, 10))
+    batch = server._decode_screenshot_batch(datas)
+    elapsed = time.perf_counter() - start
+    for token in tokens:
+        server._screenshot_store.discard(token)
+    return elapsed, batch
+
+
+def sequence(server, conn, frames, fmt):
+    token = uuid.uuid4().hex
+    height, width = frames[0].shape[:2]
+    server._sequence_store.expect(token, len(frames))
+    start = time.perf_counter()
+    parts = [struct.pack("<6I", server.SEQUENCE_MAGIC, 1, server.SEQUENCE_FORMATS[fmt], len(frames), width, height)]
+    for k, frame in enumerate(frames):
+        if fmt == "raw":
+            payload = np.concatenate([frame, np.full(frame.shape[:2] + (1,), 255, np.uint8)], axis=-1).tobytes()
+        else:
+            payload = encode(frame, "WEBP")
+        parts.append(struct.pack("<II", k, len(payload)))
+        parts.append(payload)
+    body = b"".join(parts)
+    conn.request("POST", f"/upload_sequence?token={token}", body=body,
+                 headers={"Content-Type": "application/octet-stream"})
+    resp = conn.getresponse()
+    resp.read()
+    if resp.status != 200:
+        raise RuntimeError(f"upload failed: HTTP {resp.status}")
+    batch = server._sequence_store.wait(token, 10)["batch"]
+    elapsed = time.perf_counter() - start
+    server._sequence_store.discard(token)
+    return elapsed, batch, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=72)
+    parser.add_argument("--resolution", type=int, default=512)
+    args = parser.parse_args()
+
+    plugin = load_plugin()
+    server = load_submodule("viewer_server")
+    port = free_port()
+    plugin.Open3DViewer().open_viewer("ve2.html", auto_open=False, port=port)
+    time.sleep(0.2)
+    frames = synthetic_frames(args.frames, args.resolution)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    try:
+        print(f"{'mode':>10} {'frames':>7} {'MB sent':>8} {'seconds':>8} {'frames/s':>9}")
+        elapsed, _ = per_frame(server, conn, frames)
+        print(f"{'per-frame':>10} {args.frames:>7} {'-':>8} {elapsed:>8.3f} {args.frames / elapsed:>9.1f}")
+        for fmt in ("raw", "webp"):
+            elapsed, batch, sent = sequence(server, conn, frames, fmt)
+            assert batch.shape == (args.frames, args.resolution, args.resolution, 3)
+            print(f"{fmt:>10} {args.frames:>7} {sent / 2**20:>8.1f} {elapsed:>8.3f} {args.frames / elapsed:>9.1f}")
+    finally:
+        conn.close()
+        server.shutdown_viewer_server()
+
+
+if __name__ == "__main__":
+    main()
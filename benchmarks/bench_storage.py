@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+紧凑存储基准：imaaaa.load_images 默认与 compact_storage（以 uint8 解码，有 torch 时在输出时转换为 float32 tensor，否则直接输出 uint8 包装器）保存批次时的峰值 RSS 与耗时
+
+用法: python benchmarks/bench_storage.py [--count 200] [--resolution 1024]
+每种方式在独立子进程中运行：读取目录后模拟预览节点逐帧调用 .cpu().numpy()（每帧用完即释放），
+再用 iter_float32() 分块遍历一次完整的 float32 数据；峰值 RSS 取 getrusage 的 ru_maxrss，
+减去导入插件后的基线，只统计读取与转换增加的内存（仅支持 Linux / macOS）
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+from _common import PLUGIN_DIR, make_image_dir, remove_dir
+
+CHILD = r"""
+import json, resource, sys, time
+sys.path.insert(0, {benchmarks!r})
+from _common import load_plugin
+
+def peak_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (2**20 if sys.platform == "darwin" else 2**10)
+
+plugin = load_plugin()
+from ComfyUI_3DViewer import image_io
+base = peak_mb()
+start = time.perf_counter()
+images, _ = plugin.imaaaa().load_images({directory!r}, decode_workers=1, compact_storage={compact!r})
+load_s = time.perf_counter() - start
+load_mb = peak_mb() - base
+wrapper = images if isinstance(images, image_io._NumpyTensorWrapper) else image_io._NumpyTensorWrapper(images.numpy())
+start = time.perf_counter()
+for frame in wrapper:
+    frame.cpu().numpy()
+checksum = 0.0
+for chunk in wrapper.iter_float32():
+    checksum += float(chunk[:, ::64, ::64].sum())
+consume_s = time.perf_counter() - start
+print(json.dumps({{"load_s": load_s, "load_mb": load_mb, "consume_s": consume_s, "peak_mb": peak_mb() - base}}))
+"""
+
+
+def run(directory, compact):
+    code = CHILD.format(benchmarks=str(PLUGIN_DIR / "benchmarks"), directory=directory, compact=compact)
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--resolution", type=int, default=1024)
+    args = parser.parse_args()
+
+    directory = make_image_dir(args.count, args.resolution, args.resolution, fmt="jpg")
+    try:
+        print(f"{args.count} 帧 {args.resolution}x{args.resolution}")
+        print(f"{'storage':>8} {'load s':>8} {'load MB':>9} {'consume s':>10} {'peak MB':>9}")
+        for compact in (False, True):
+            r = run(directory, compact)
+            name = "compact" if compact else "float32"
+            print(f"{name:>8} {r['load_s']:>8.2f} {r['load_mb']:>9.1f} {r['consume_s']:>10.2f} {r['peak_mb']:>9.1f}")
+    finally:
+        remove_dir(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+缩小读取基准：大尺寸 JPEG 目录读取到 --target-size（最长边）时，逐像素解码后缩放 与
+缩小解码（draft）+ 整数倍缩小（reduce）两种方式的耗时，并给出两者的最大像素差；
+合成帧为平滑渐变加轻微噪声（接近照片的压缩率，纯噪声图的熵解码开销会掩盖缩小解码的收益）
+
+用法: python benchmarks/bench_target_size.py [--count 8] [--width 6000] [--height 4000] [--target-size 1024]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from _common import load_submodule, remove_dir
+
+
+def make_photo_dir(count, width, height):
+    from PIL import Image
+
+    directory = tempfile.mkdtemp(prefix="bb3d_bench_")
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([128 + 100 * np.sin(x / 300 + y / 500), 128 + 100 * np.cos(x / 170), 128 + 80 * np.sin(y / 90)], -1)
+    base += np.random.default_rng(count).normal(0, 6, base.shape)
+    base = np.clip(base, 0, 255).astype(np.uint8)
+    for k in range(count):
+        Image.fromarray(np.roll(base, k * 50, axis=1)).save(os.path.join(directory, f"frame_{k:05d}.jpg"), quality=90)
+    return directory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=8)
+    parser.add_argument("--width", type=int, default=6000)
+    parser.add_argument("--height", type=int, default=4000)
+    parser.add_argument("--target-size", type=int, default=1024)
+    parser.add_argument("--decode-workers", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    image_io = load_submodule("image_io")
+    directory = make_photo_dir(args.count, args.width, args.height)
+    try:
+        paths = sorted(os.path.join(directory, name) for name in os.listdir(directory))
+        size = image_io._target_frame_size(paths[0], args.target_size)
+        print(f"{args.count} 帧 {args.width}x{args.height} JPEG -> {size[0]}x{size[1]}")
+        outputs, medians = {}, {}
+        for name, reduce in (("full decode", False), ("draft+reduce", True)):
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                outputs[name], _ = image_io._decode_image_batch(paths, args.decode_workers, None, size, reduce=reduce)
+                samples.append(time.perf_counter() - start)
+            medians[name] = statistics.median(samples)
+            print(f"  {name:<13} {medians[name]:.3f}s  {args.count / medians[name]:.1f} frames/s")
+        diff = np.abs(outputs["full decode"] - outputs["draft+reduce"]) * 255
+        print(f"  加速 {medians['full decode'] / medians['draft+reduce']:.1f}x, "
+              f"像素差 平均 {float(diff.mean()):.2f}/255, 最大 {float(diff.max()):.1f}/255")
+    finally:
+        remove_dir(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+/upload_screenshot 吞吐基准：JSON(base64 dataURL) 上传与二进制 PNG 上传对比
+
+用法: python benchmarks/bench_upload.py [--resolutions 1080p 4K 8K] [--repeat 3]
+启动插件自带的查看器服务器（不打开浏览器），对每个分辨率生成一张噪声 PNG
+（不可压缩，接近最坏情况）并分别以两种方式上传，输出耗时与 MB/s。
+上传会覆盖插件目录下的 image.png，脚本结束后恢复原文件。
+"""
+
+import argparse
+import base64
+import http.client
+import io
+import json
+import socket
+import time
+
+import numpy as np
+
+from _common import PLUGIN_DIR, load_plugin
+
+RESOLUTIONS = {
+    "1080p": (1920, 1080),
+    "4K": (3840, 2160),
+    "8K": (7680, 4320),
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def noise_png(width, height):
+    from PIL import Image
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format="PNG", compress_level=1)
+    return buf.getvalue()
+
+
+def post(port, body, content_type):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    start = time.perf_counter()
+    conn.request("POST", "/upload_screenshot?token=bench", body=body, headers={"Content-Type": content_type})
+    resp = conn.getresponse()
+    resp.read()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    if resp.status != 200:
+        raise RuntimeError(f"upload failed: HTTP {resp.status}")
+    return elapsed
+
+
+def best_of(repeat, fn):
+    return min(fn() for _ in range(repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    plugin = load_plugin()
+    port = free_port()
+    plugin.Open3DViewer().open_viewer("ve2.html", auto_open=False, port=port)
+    time.sleep(0.2)
+
+    saved = PLUGIN_DIR / "image.png"
+    backup = saved.read_bytes() if saved.exists() else None
+    try:
+        print(f"{'res':>6} {'PNG MB':>7} {'json s':>8} {'json MB/s':>10} {'binary s':>9} {'binary MB/s':>12}")
+        for name in args.resolutions:
+            png = noise_png(*RESOLUTIONS[name])
+            mb = len(png) / 2**20
+            body = json.dumps({"dataUrl": "data:image/png;base64," + base64.b64encode(png).decode("ascii")}).encode("utf-8")
+            json_t = best_of(args.repeat, lambda: post(port, body, "application/json"))
+            bin_t = best_of(args.repeat, lambda: post(port, png, "image/png"))
+            print(f"{name:>6} {mb:>7.1f} {json_t:>8.3f} {mb / json_t:>10.1f} {bin_t:>9.3f} {mb / bin_t:>12.1f}")
+    finally:
+        if backup is not None:
+            saved.write_bytes(backup)
+        elif saved.exists():
+            saved.unlink()
+
+
+if __name__ == "__main__":
+    main()
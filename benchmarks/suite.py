@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+基准测试套件：图像读取节点、目录排序与查看器 HTTP 接口，结果输出为 JSON，可与保存的基线对比
+
+用法:
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --baseline results.json [--threshold 1.15]
+    python benchmarks/suite.py --only loader sort --counts 16 256 --formats png jpg webp --resolutions 256 1024
+
+- loader：为每种 (帧数, 格式, 分辨率) 生成合成图像目录，测量 imaaaa.load_images
+- sort：在 --sort-files 个小文件的目录上测量每种 sort_methods 的冷启动（扫描 + 排序）与缓存命中耗时
+- http：启动插件自带的查看器服务器，用 --clients 个并发的 keep-alive 客户端测量 /next_command 空闲轮询，
+  以及同样数量的模拟查看器下 提交截图命令 -> /next_command 取走 -> /upload_screenshot 上传 -> 节点收到 的往返
+全部在本机完成（不联网、不需要 GPU 或浏览器）；每项取 --repeat 次的中位数，
+对比模式下中位数超过基线 threshold 倍的项目记为回退，并以退出码 1 结束
+"""
+
+import argparse
+import http.client
+import io
+import json
+import os
+import platform
+import socket
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from _common import load_plugin, load_submodule, make_image_dir, remove_dir
+
+SUITES = ("loader", "sort", "http")
+# 与 image_io.IMAGE_EXTENSIONS 保持一致：读取节点只接受这些格式，其他格式生成的目录会被当作空目录
+LOADER_FORMATS = ("png", "jpg", "webp")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def result(name, params, samples, items=None):
+    """一项结果：耗时按秒记录，items 为每次处理的条目数（用于计算吞吐）"""
+    median = statistics.median(samples)
+    entry = {
+        "name": name,
+        "params": params,
+        "median": median,
+        "best": min(samples),
+        "samples": samples,
+    }
+    if items:
+        entry["per_second"] = items / median if median else None
+    return entry
+
+
+def case_key(entry):
+    return entry["name"] + "[" + ",".join(f"{k}={v}" for k, v in sorted(entry["params"].items())) + "]"
+
+
+#
+# loader / sort
+#
+def bench_loader(plugin, args):
+    results = []
+    node = plugin.imaaaa()
+    for count in args.counts:
+        for fmt in args.formats:
+            for resolution in args.resolutions:
+                directory = make_image_dir(count, resolution, resolution, fmt=fmt)
+                try:
+                    node.load_images(directory)  # 预热目录索引
+                    samples = timed(lambda: node.load_images(directory, decode_workers=args.decode_workers), args.repeat)
+                finally:
+                    remove_dir(directory)
+                entry = result("load_images", {"count": count, "format": fmt, "resolution": resolution}, samples, count)
+                print(f"  load_images {count:>5} x {fmt:<4} {resolution:>5}px  {entry['median']:.4f}s  "
+                      f"{entry['per_second']:.1f} frames/s")
+                results.append(entry)
+    return results
+
+
+def bench_sort(plugin, args):
+    results = []
+    image_io = load_submodule("image_io")
+    directory = make_image_dir(args.sort_files, 8, 8)
+    try:
+        # 打乱 mtime，使 Datetime 排序与文件名顺序不同
+        rng = np.random.default_rng(0)
+        for name in os.listdir(directory):
+            t = 1.6e9 + rng.uniform(0, 1e7)
+            os.utime(os.path.join(directory, name), (t, t))
+        for method in plugin.sort_methods:
+            def cold():
+                image_io._DirectoryIndex(directory).sorted_names(method)
+            index = image_io._DirectoryIndex(directory)
+            index.sorted_names(method)
+            for mode, fn in (("cold", cold), ("cached", lambda: index.sorted_names(method))):
+                entry = result("sort", {"method": method, "mode": mode, "files": args.sort_files},
+                               timed(fn, args.repeat), args.sort_files)
+                print(f"  sort {method:<20} {mode:<6} {entry['median'] * 1000:.3f} ms")
+                results.append(entry)
+    finally:
+        remove_dir(directory)
+    return results
+
+
+#
+# http
+#
+def png_bytes(size):
+    from PIL import Image
+    y, x = np.mgrid[0:size, 0:size]
+    buf = io.BytesIO()
+    Image.fromarray(((x + y) % 256).astype(np.uint8)).convert("RGB").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def run_clients(clients, per_client, worker):
+    """clients 个线程各自持有一条 keep-alive 连接执行 per_client 次 worker，返回 (总耗时, 每次延迟列表)"""
+    latencies = []
+    lock = threading.Lock()
+
+    def client(k):
+        conn, local = worker.connect(), []
+        try:
+            for i in range(per_client):
+                start = time.perf_counter()
+                worker(conn, k, i)
+                local.append(time.perf_counter() - start)
+        finally:
+            conn.close()
+        with lock:
+            latencies.extend(local)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+    return time.perf_counter() - start, latencies
+
+
+class _Client:
+    def __init__(self, port):
+        self.port = port
+
+    def connect(self):
+        return http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+
+    def request(self, conn, method, path, body=None, headers=None):
+        conn.request(method, path, body=body, headers=headers or {})
+        resp = conn.getresponse()
+        data = resp.read()
+        if resp.status != 200:
+            raise RuntimeError(f"{method} {path}: HTTP {resp.status}")
+        return data
+
+
+class PollWorker(_Client):
+    """空闲轮询：每个客户端以自己的 viewer id 调用 /next_command?wait=0"""
+
+    def __call__(self, conn, k, i):
+        self.request(conn, "GET", f"/next_command?wait=0&viewer=bench{k}")
+
+
+class ViewerClient(_Client):
+    """模拟查看器页面：以自己的 viewer id 长轮询 /next_command，取到截图命令后上传 PNG，直到 stop 被设置"""
+
+    def __init__(self, port, viewer_id, payload, stop):
+        super().__init__(port)
+        self.viewer_id = viewer_id
+        self.payload = payload
+        self.stop = stop
+
+    def run(self):
+        conn = self.connect()
+        try:
+            while not self.stop.is_set():
+                command = json.loads(self.request(conn, "GET", f"/next_command?wait=0.5&viewer={self.viewer_id}"))
+                token = command.get("token")
+                if token:
+                    self.request(conn, "POST", f"/upload_screenshot?token={token}", self.payload,
+                                 {"Content-Type": "image/png"})
+        finally:
+            conn.close()
+
+
+def capture_roundtrip(port, clients, per_client, payload):
+    """
+    clients 个模拟查看器 + clients 个并发的节点侧提交者：每次登记 token、提交截图命令并等待上传到达，
+    测量 提交 -> /next_command 取走 -> /upload_screenshot 上传 -> 节点收到 的往返延迟
+    """
+    server = load_submodule("viewer_server")
+    store = server._screenshot_store
+    stop = threading.Event()
+    viewers = [threading.Thread(target=ViewerClient(port, f"bench{k}", payload, stop).run, daemon=True)
+               for k in range(clients)]
+    for t in viewers:
+        t.start()
+    latencies = []
+    lock = threading.Lock()
+
+    def submitter(k):
+        local = []
+        for _ in range(per_client):
+            token = uuid.uuid4().hex
+            store.expect(token)
+            try:
+                start = time.perf_counter()
+                server._queue_capture_command(token)
+                if store.wait(token, 10) is None:
+                    raise RuntimeError("upload not received")
+                local.append(time.perf_counter() - start)
+            finally:
+                store.discard(token)
+        with lock:
+            latencies.extend(local)
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            list(pool.map(submitter, range(clients)))
+        return time.perf_counter() - start, latencies
+    finally:
+        stop.set()
+        for t in viewers:
+            t.join()
+
+
+def bench_http(plugin, args):
+    results = []
+    port = free_port()
+    plugin.Open3DViewer().open_viewer("ve2.html", auto_open=False, port=port)
+    time.sleep(0.2)
+    payload = png_bytes(args.upload_resolution)
+    try:
+        for clients in args.clients:
+            runs = (
+                ("next_command", lambda: run_clients(clients, args.requests, PollWorker(port))),
+                ("capture_roundtrip", lambda: capture_roundtrip(port, clients, args.requests, payload)),
+            )
+            for name, run in runs:
+                walls, latencies = [], []
+                for _ in range(args.repeat):
+                    wall, lat = run()
+                    walls.append(wall)
+                    latencies.extend(lat)
+                total = clients * args.requests
+                entry = result(name, {"clients": clients, "requests": args.requests}, walls, total)
+                latencies.sort()
+                entry["latency_p50"] = latencies[len(latencies) // 2]
+                entry["latency_p95"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+                print(f"  {name:<17} clients={clients:<3} {entry['per_second']:.1f} req/s  "
+                      f"p50 {entry['latency_p50'] * 1000:.2f} ms  p95 {entry['latency_p95'] * 1000:.2f} ms")
+                results.append(entry)
+    finally:
+        plugin.shutdown_viewer_server(port)
+    return results
+
+
+#
+# 输出与对比
+#
+def environment():
+    try:
+        from PIL import __version__ as pillow_version
+    except Exception:
+        pillow_version = None
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pillow": pillow_version,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline_path, threshold):
+    """按项目对比中位数，返回回退项目数"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {case_key(e): e for e in json.load(f)["results"]}
+    regressions = 0
+    print(f"\n对比基线 {baseline_path}（阈值 {threshold:.2f}x）")
+    print(f"{'case':<70} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for entry in results:
+        key = case_key(entry)
+        old = baseline.get(key)
+        if old is None:
+            print(f"{key:<70} {'-':>10} {entry['median']:>10.4f} {'new':>7}")
+            continue
+        ratio = entry["median"] / old["median"] if old["median"] else float("inf")
+        flag = ""
+        if ratio > threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{key:<70} {old['median']:>10.4f} {entry['median']:>10.4f} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--counts", type=int, nargs="+", default=[16, 128])
+    parser.add_argument("--formats", nargs="+", default=["png", "jpg"], choices=LOADER_FORMATS)
+    parser.add_argument("--resolutions", type=int, nargs="+", default=[256, 512])
+    parser.add_argument("--decode-workers", type=int, default=0)
+    parser.add_argument("--sort-files", type=int, default=5000)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--requests", type=int, default=50, help="每个客户端的请求数")
+    parser.add_argument("--upload-resolution", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="结果 JSON 路径")
+    parser.add_argument("--baseline", help="与该 JSON 结果对比")
+    parser.add_argument("--threshold", type=float, default=1.15, help="中位数超过基线该倍数视为回退")
+    args = parser.parse_args()
+
+    plugin = load_plugin()
+    runners = {"loader": bench_loader, "sort": bench_sort, "http": bench_http}
+    results = []
+    for suite in SUITES:
+        if suite in args.only:
+            print(f"[{suite}]")
+            results.extend(runners[suite](plugin, args))
+
+    report = {"environment": environment(), "args": vars(args), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n结果已写入 {args.output}")
+    if args.baseline and compare(results, args.baseline, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,682 @@
+"""
+图像目录读取：目录索引与排序、多线程解码到预分配批次、解码帧磁盘缓存，以及没有 torch 时的 IMAGE 包装器
+
+依赖 numpy / PIL（可选 torch、pillow_jxl），由 🔵BB 读取图像 等节点在执行时才导入
+"""
+
+import functools
+import hashlib
+import math
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    from PIL import Image
+    import numpy as np
+except Exception:
+    Image = None
+    np = None
+try:
+    # Optional extra imaging helper used by the image-loading node
+    from PIL import ImageOps
+except Exception:
+    ImageOps = None
+try:
+    import torch as _torch
+    TORCH_AVAILABLE = True
+except Exception:
+    _torch = None
+    TORCH_AVAILABLE = False
+# expose a name `torch` for compatibility with imported node code
+torch = _torch
+
+PLUGIN_DIR = Path(__file__).parent
+
+# 紧凑存储（uint8）批次转换为 float32 时每块的大小上限（字节，至少一帧）
+IMAGE_CONVERT_CHUNK_BYTES = 64 * 1024 * 1024
+
+
+# 轻量包装器（当没有 torch 时，提供 .cpu()/.numpy() 接口以兼容 ComfyUI 预览）
+class _NumpyTensorWrapper:
+    """
+    直接持有 numpy 数组（不复制）的 IMAGE 包装器，支持 [H,W,C] 单帧与 [N,H,W,C] 批次；
+    len() / 下标 / 迭代按批次维度返回子批次的视图包装
+    """
+    __slots__ = ('_arr', '_chw', 'shape')
+
+    def __init__(self, arr):
+        self._arr = np.asarray(arr) if np is not None else arr
+        # numpy() 的结果，首次调用时才计算
+        self._chw = None
+        self.shape = getattr(self._arr, 'shape', None)
+
+    def cpu(self):
+        return self
+
+    def to(self, *args, **kwargs):
+        return self
+
+    def __len__(self):
+        return len(self._arr)
+
+    def __getitem__(self, index):
+        return _NumpyTensorWrapper(self._arr[index])
+
+    def __iter__(self):
+        for index in range(len(self._arr)):
+            yield self[index]
+
+    def iter_float32(self, chunk_frames=None):
+        """
+        按批次维度分块产出归一化到 0..1 的 [k,H,W,C] float32 数组：float32 存储时直接产出视图，
+        uint8 等整数存储时每块单独分配并向量化转换（默认每块不超过 IMAGE_CONVERT_CHUNK_BYTES），
+        调用方用完一块即释放时峰值只多出一两块的大小
+        """
+        arr = self._arr if self._arr.ndim == 4 else self._arr[np.newaxis, ...]
+        if chunk_frames is None:
+            chunk_frames = max(1, IMAGE_CONVERT_CHUNK_BYTES // max(1, arr[0].size * 4))
+        for start in range(0, len(arr), chunk_frames):
+            chunk = arr[start:start + chunk_frames]
+            if chunk.dtype == np.float32:
+                yield chunk
+                continue
+            out = np.empty(chunk.shape, dtype=np.float32)
+            np.multiply(chunk, 1.0 / 255.0 if chunk.dtype.kind in ('u', 'i') else 1.0, out=out, casting='unsafe')
+            yield out
+
+    def float32(self, chunk_frames=None):
+        """完整的 [N,H,W,C] float32 批次（已是 float32 时不复制，否则分块转换进一次预分配的缓冲区）"""
+        if self._arr.dtype == np.float32:
+            return self._arr
+        out = np.empty(self._arr.shape, dtype=np.float32)
+        flat = out if out.ndim == 4 else out[np.newaxis, ...]
+        offset = 0
+        for chunk in self.iter_float32(chunk_frames):
+            flat[offset:offset + len(chunk)] = chunk
+            offset += len(chunk)
+        return out
+
+    def numpy(self):
+        """
+        Return a numpy array in CHW float32 format (channels, height, width)
+        normalized to 0..1 to mimic torch.Tensor.cpu().numpy() behavior.
+        This is the format ComfyUI preview expects when a tensor-like object
+        is provided.
+
+        批次输入返回 [N,C,H,W]。结果只计算一次并缓存；输入已是 float32 时直接返回原缓冲区的转置视图
+        （与 torch 的 .numpy() 一样共享内存），整数输入按 /255 归一化，只分配一次输出
+        """
+        if self._chw is None:
+            self._chw = self._channels_first(self._arr)
+        return self._chw
+
+    @staticmethod
+    def _channels_first(arr):
+        ndim = getattr(arr, 'ndim', None)
+        if np is None or ndim is None:
+            return arr
+        if ndim == 2:
+            view = arr[np.newaxis, ...]
+        elif ndim >= 3:
+            view = np.moveaxis(arr[..., :3], -1, -3)
+        else:
+            view = arr
+        if view.dtype == np.float32:
+            return view
+        out = np.empty(view.shape, dtype=np.float32)
+        if view.dtype.kind in ('u', 'i'):
+            np.multiply(view, 1.0 / 255.0, out=out, casting='unsafe')
+        else:
+            np.copyto(out, view, casting='unsafe')
+        return out
+
+
+_FIRST_NUMBER_RE = re.compile(r'\d+')
+
+
+def extract_first_number(s):
+    match = _FIRST_NUMBER_RE.search(s)
+    return int(match.group()) if match else float('inf')
+
+
+def sort_by(items, base_path='.', method=None):
+    def fullpath(x): return os.path.join(base_path, x)
+
+    def get_timestamp(path):
+        try:
+            return os.path.getmtime(path)
+        except FileNotFoundError:
+            return float('-inf')
+
+    if method == "Alphabetical (ASC)":
+        return sorted(items)
+    elif method == "Alphabetical (DESC)":
+        return sorted(items, reverse=True)
+    elif method == "Numerical (ASC)":
+        return sorted(items, key=lambda x: extract_first_number(os.path.splitext(x)[0]))
+    elif method == "Numerical (DESC)":
+        return sorted(items, key=lambda x: extract_first_number(os.path.splitext(x)[0]), reverse=True)
+    elif method == "Datetime (ASC)":
+        return sorted(items, key=lambda x: get_timestamp(fullpath(x)))
+    elif method == "Datetime (DESC)":
+        return sorted(items, key=lambda x: get_timestamp(fullpath(x)), reverse=True)
+    else:
+        return items
+
+
+try:
+    import pillow_jxl  # noqa: F401
+    jxl = True
+except Exception:
+    jxl = False
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp') + (('.jxl',) if jxl else ())
+
+
+# EXIF Orientation 取值为 5~8 时 exif_transpose 会交换宽高
+_EXIF_ORIENTATION_TAG = 0x0112
+_EXIF_SWAPS_SIZE = (5, 6, 7, 8)
+
+
+def _open_oriented(i):
+    """按 EXIF 方向信息旋转图像（不可用或失败时原样返回）"""
+    if ImageOps is not None:
+        try:
+            return ImageOps.exif_transpose(i)
+        except Exception:
+            pass
+    return i
+
+
+def _image_size(image_path):
+    """只读取文件头，返回经 EXIF 方向校正后的 (width, height)"""
+    with Image.open(image_path) as i:
+        width, height = i.size
+        if ImageOps is not None:
+            try:
+                if i.getexif().get(_EXIF_ORIENTATION_TAG) in _EXIF_SWAPS_SIZE:
+                    width, height = height, width
+            except Exception:
+                pass
+    return width, height
+
+
+def _has_alpha(image_path):
+    """只读取文件头，判断解码时是否会提取遮罩（与 _decode_into 相同，以是否有 A 通道为准）"""
+    try:
+        with Image.open(image_path) as i:
+            return 'A' in i.getbands()
+    except Exception:
+        return False
+
+
+def _target_frame_size(image_path, target_size):
+    """输出帧尺寸：首帧尺寸；target_size > 0 时按比例缩小到最长边不超过 target_size（不放大）"""
+    width, height = _image_size(image_path)
+    if target_size > 0 and max(width, height) > target_size:
+        scale = target_size / max(width, height)
+        width, height = max(1, round(width * scale)), max(1, round(height * scale))
+    return width, height
+
+
+@functools.lru_cache(maxsize=256)
+def _draft_request(source_width, source_height, width, height):
+    """
+    同一源尺寸只计算一次：居中裁剪后缩放到 (width, height) 的比例，以及请求 JPEG draft() 的最小解码尺寸；
+    不需要缩小时返回 None
+    """
+    ratio = max(width / source_width, height / source_height)
+    if ratio >= 0.5:
+        return None
+    return math.ceil(source_width * ratio), math.ceil(source_height * ratio)
+
+
+def _draft(img, width, height):
+    """
+    JPEG 按 1/2、1/4、1/8 缩小解码（DCT 域缩放，只解码需要的分辨率），解码后的尺寸仍不小于
+    居中裁剪缩放到 (width, height) 所需的尺寸；必须在加载像素与 EXIF 旋转之前调用
+    """
+    if img.format != 'JPEG':
+        return
+    source_width, source_height = img.size
+    swapped = False
+    try:
+        swapped = img.getexif().get(_EXIF_ORIENTATION_TAG) in _EXIF_SWAPS_SIZE
+    except Exception:
+        pass
+    if swapped:
+        width, height = height, width
+    request = _draft_request(source_width, source_height, width, height)
+    if request is not None:
+        img.draft(None, request)
+
+
+def _fit_center(img, width, height, reducing_gap=None):
+    """
+    居中裁剪到目标宽高比后双线性缩放，与 comfy.utils.common_upscale(..., "bilinear", "center") 的裁剪方式一致
+
+    reducing_gap: 大倍数缩小时先用 Image.reduce() 做整数倍盒式缩小，再对剩余不超过该倍数的部分双线性缩放
+    """
+    old_width, old_height = img.size
+    old_aspect = old_width / old_height
+    new_aspect = width / height
+    x = 0
+    y = 0
+    if old_aspect > new_aspect:
+        x = round((old_width - old_width * (new_aspect / old_aspect)) / 2)
+    elif old_aspect < new_aspect:
+        y = round((old_height - old_height * (old_aspect / new_aspect)) / 2)
+    return img.resize((width, height), Image.BILINEAR, box=(x, y, old_width - x, old_height - y),
+                      reducing_gap=reducing_gap)
+
+
+def _decode_into(image_path, images, index, get_mask, reduce=False):
+    """
+    解码图像并直接写入预分配缓冲区的第 index 个槽位，尺寸不同时原地缩放
+
+    get_mask: 仅在图像带 alpha 通道时调用，返回本帧的 [H,W] 遮罩槽位（写入反相 alpha）
+    reduce: 大倍数缩小时 JPEG 先用 draft() 缩小解码，缩放时再用 reduce() 整数倍缩小（结果与逐像素缩放略有差异）
+
+    Returns:
+        写入的遮罩槽位，没有 alpha（或未提取）时为 None
+    """
+    height, width = images.shape[1:3]
+    reducing_gap = 2.0 if reduce else None
+    with Image.open(image_path) as i:
+        if reduce:
+            _draft(i, width, height)
+        i = _open_oriented(i)
+        rgb = i.convert("RGB")
+        if rgb.size != (width, height):
+            rgb = _fit_center(rgb, width, height, reducing_gap)
+        if images.dtype == np.uint8:
+            np.copyto(images[index], np.asarray(rgb))
+        else:
+            np.multiply(np.asarray(rgb), 1.0 / 255.0, out=images[index], casting='unsafe')
+        if 'A' not in i.getbands():
+            return None
+        alpha = i.getchannel('A')
+        if alpha.size != (width, height):
+            # 与 RGB 相同的居中裁剪，保证遮罩与图像对齐
+            alpha = _fit_center(alpha, width, height, reducing_gap)
+        mask = get_mask()
+        np.multiply(np.asarray(alpha), -1.0 / 255.0, out=mask, casting='unsafe')
+        mask += 1.0
+    return mask
+
+
+class _FrameCache:
+    """
+    已解码帧的磁盘缓存：键为 (路径, mtime, 文件大小, 目标形状, dtype, 是否缩小解码)，
+    值为归一化后的 .npy 文件（读取时内存映射），按最近使用时间做 LRU 淘汰
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> 占用字节数，按最近使用顺序排列（首次使用时从磁盘重建）
+        self._entries = None
+
+    def _key(self, image_path, stat, shape, dtype, reduce=False):
+        raw = f"{os.path.abspath(image_path)}|{stat.st_mtime_ns}|{stat.st_size}|{tuple(shape)}|{np.dtype(dtype).str}"
+        if reduce:
+            # 缩小解码的像素与逐像素缩放略有不同，两者不能共用条目（不缩小时保持原来的键）
+            raw += "|reduce"
+        return hashlib.sha1(raw.encode('utf-8', errors='surrogateescape')).hexdigest()
+
+    def _files(self, key):
+        return self.root / f"{key}.npy", self.root / f"{key}.mask.npy"
+
+    def _load_index(self):
+        if self._entries is not None:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        sizes = {}
+        mtimes = {}
+        for entry in os.scandir(self.root):
+            if not entry.name.endswith('.npy'):
+                continue
+            key = entry.name.split('.', 1)[0]
+            st = entry.stat()
+            sizes[key] = sizes.get(key, 0) + st.st_size
+            mtimes[key] = max(mtimes.get(key, 0), st.st_mtime_ns)
+        self._entries = OrderedDict((k, sizes[k]) for k in sorted(sizes, key=mtimes.get))
+
+    def load_into(self, image_path, stat, images, index, get_mask, reduce=False):
+        """命中时把缓存帧拷贝进 images[index]（有遮罩时拷贝进 get_mask() 返回的槽位），返回是否命中"""
+        key = self._key(image_path, stat, images.shape[1:], images.dtype, reduce)
+        image_file, mask_file = self._files(key)
+        with self._lock:
+            self._load_index()
+            if key not in self._entries:
+                return False
+            self._entries.move_to_end(key)
+        try:
+            np.copyto(images[index], np.load(image_file, mmap_mode='r'))
+            if mask_file.exists():
+                np.copyto(get_mask(), np.load(mask_file, mmap_mode='r'))
+            # 更新 mtime 以便重启后仍能恢复 LRU 顺序
+            os.utime(image_file)
+        except Exception:
+            self._discard(key)
+            return False
+        return True
+
+    def store(self, image_path, stat, image, mask=None, reduce=False):
+        key = self._key(image_path, stat, image.shape, image.dtype, reduce)
+        image_file, mask_file = self._files(key)
+        with self._lock:
+            self._load_index()
+        size = 0
+        try:
+            # 先写遮罩再写图像：图像文件存在即表示条目完整
+            if mask is not None:
+                size += self._write_atomic(mask_file, mask)
+            size += self._write_atomic(image_file, image)
+        except Exception:
+            self._discard(key)
+            return
+        with self._lock:
+            self._entries[key] = size
+            self._entries.move_to_end(key)
+            evicted = self._evict()
+        for old_key in evicted:
+            self._unlink(old_key)
+
+    def _write_atomic(self, target, array):
+        fd, tmp_name = tempfile.mkstemp(suffix='.tmp', dir=str(self.root))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, np.ascontiguousarray(array))
+            os.replace(tmp_name, str(target))
+        except Exception:
+            try:
+                os.unlink(tmp_name)
+            except Exception:
+                pass
+            raise
+        return os.path.getsize(target)
+
+    def _evict(self):
+        evicted = []
+        total = sum(self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            old_key, size = self._entries.popitem(last=False)
+            total -= size
+            evicted.append(old_key)
+        return evicted
+
+    def _discard(self, key):
+        with self._lock:
+            if self._entries is not None:
+                self._entries.pop(key, None)
+        self._unlink(key)
+
+    def _unlink(self, key):
+        for f in self._files(key):
+            try:
+                os.unlink(f)
+            except FileNotFoundError:
+                pass
+            except Exception:
+                pass
+
+
+# 解码帧缓存（需要时才创建目录）
+FRAME_CACHE_DIR = PLUGIN_DIR / "cache" / "frames"
+FRAME_CACHE_MAX_BYTES = 4 * 1024 ** 3
+_frame_cache = _FrameCache(FRAME_CACHE_DIR, FRAME_CACHE_MAX_BYTES)
+
+
+def _directory_fingerprint(directory):
+    """根据目录中图像文件的名称、mtime 与大小计算指纹，内容变化时指纹随之变化"""
+    digest = hashlib.sha1()
+    try:
+        entries = sorted(
+            (entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+            for entry in os.scandir(directory)
+            if entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file()
+        )
+    except OSError:
+        return ""
+    for name, mtime_ns, size in entries:
+        digest.update(f"{name}\0{mtime_ns}\0{size}\n".encode('utf-8', errors='surrogateescape'))
+    return digest.hexdigest()
+
+
+def _resolve_decode_workers(decode_workers, count):
+    """0 表示自动（按 CPU 核数），结果不超过待解码的文件数"""
+    if decode_workers <= 0:
+        decode_workers = os.cpu_count() or 1
+    return max(1, min(decode_workers, count))
+
+
+def _decode_image_batch(paths, decode_workers=0, cache=None, size=None, dtype='float32', reduce=False):
+    """
+    先读取首帧尺寸（或使用 size=(width, height)），预分配 [N,H,W,3] 图像缓冲区，再用线程池（Pillow 解码时会释放 GIL）
+    把每一帧直接解码进对应槽位，顺序与 paths 一致。
+    [N,H,W] 遮罩缓冲区只在遇到第一张带 alpha 的图像时才分配。
+    传入 cache（_FrameCache）时，未变化的帧直接从缓存拷贝，不再重复解码。
+    dtype 为 'uint8' 时按原始像素值保存（紧凑存储，内存为 float32 的 1/4），不做归一化。
+    reduce=True 时尺寸不同的帧以缩小解码 + 整数倍缩小接近目标尺寸（见 _decode_into）。
+
+    Returns:
+        (images, masks): masks 为 None 表示没有任何一帧带 alpha
+    """
+    width, height = size or _image_size(paths[0])
+    images = np.empty((len(paths), height, width, 3), dtype=dtype)
+    masks = []
+    masks_lock = threading.Lock()
+
+    def get_masks():
+        with masks_lock:
+            if not masks:
+                masks.append(np.zeros((len(paths), height, width), dtype=np.float32))
+            return masks[0]
+
+    def decode(index):
+        def get_mask():
+            return get_masks()[index]
+
+        if cache is None:
+            _decode_into(paths[index], images, index, get_mask, reduce)
+            return
+        stat = os.stat(paths[index])
+        if cache.load_into(paths[index], stat, images, index, get_mask, reduce):
+            return
+        mask = _decode_into(paths[index], images, index, get_mask, reduce)
+        cache.store(paths[index], stat, images[index], mask, reduce)
+
+    workers = _resolve_decode_workers(decode_workers, len(paths))
+    if workers == 1:
+        for index in range(len(paths)):
+            decode(index)
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bb3d-decode") as pool:
+            list(pool.map(decode, range(len(paths))))
+    return images, (masks[0] if masks else None)
+
+
+class _DirectoryIndex:
+    """
+    基于 os.scandir 的图像目录索引：缓存每个图像文件的 stat 结果与排序键，
+    并按排序方式记忆排序结果。目录 mtime 变化时才重新扫描（已知文件复用数字排序键），
+    否则所有 sort_methods 都直接由缓存提供，每次查询只需 stat 目录本身
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._mtime_ns = None
+        # scandir 顺序的文件名（对应 "None" 排序）
+        self._names = []
+        # name -> (mtime, size, 首个数字)
+        self._entries = {}
+        # sort method -> 排序后的文件名列表
+        self._sorted = {}
+
+    def refresh(self):
+        """目录 mtime 变化时重新扫描，返回是否发生了刷新"""
+        mtime_ns = os.stat(self.directory).st_mtime_ns
+        with self._lock:
+            if mtime_ns == self._mtime_ns:
+                return False
+            names = []
+            entries = {}
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    previous = self._entries.get(entry.name)
+                    number = previous[2] if previous else extract_first_number(os.path.splitext(entry.name)[0])
+                    entries[entry.name] = (st.st_mtime, st.st_size, number)
+                    names.append(entry.name)
+            self._names = names
+            self._entries = entries
+            self._sorted = {}
+            self._mtime_ns = mtime_ns
+            return True
+
+    def sorted_names(self, method=None):
+        """按 sort_methods 中的方式返回排序后的文件名（结果缓存到下次刷新）"""
+        self.refresh()
+        with self._lock:
+            names = self._sorted.get(method)
+            if names is None:
+                names = self._sort(method)
+                self._sorted[method] = names
+            return names
+
+    def _sort(self, method):
+        entries = self._entries
+        if method == "Alphabetical (ASC)":
+            return sorted(self._names)
+        elif method == "Alphabetical (DESC)":
+            return sorted(self._names, reverse=True)
+        elif method == "Numerical (ASC)":
+            return sorted(self._names, key=lambda x: entries[x][2])
+        elif method == "Numerical (DESC)":
+            return sorted(self._names, key=lambda x: entries[x][2], reverse=True)
+        elif method == "Datetime (ASC)":
+            return sorted(self._names, key=lambda x: entries[x][0])
+        elif method == "Datetime (DESC)":
+            return sorted(self._names, key=lambda x: entries[x][0], reverse=True)
+        else:
+            return list(self._names)
+
+
+# 目录索引注册表：绝对路径 -> _DirectoryIndex
+_directory_indexes = {}
+_directory_indexes_lock = threading.Lock()
+
+
+def _get_directory_index(directory):
+    key = os.path.abspath(directory)
+    with _directory_indexes_lock:
+        index = _directory_indexes.get(key)
+        if index is None:
+            index = _DirectoryIndex(key)
+            _directory_indexes[key] = index
+    return index
+
+
+def _list_image_files(directory, sort_method=None):
+    """返回目录中按 sort_method 排序的图像文件完整路径（由目录索引提供）"""
+    if not os.path.isdir(directory):
+        raise FileNotFoundError(f"Directory '{directory} cannot be found.'")
+    names = _get_directory_index(directory).sorted_names(sort_method)
+    return [os.path.join(directory, x) for x in names]
+
+
+def _select_image_files(directory, start_index=0, image_load_cap=0, sort_method=None):
+    """按 start_index / image_load_cap 截取一页文件路径"""
+    dir_files = _list_image_files(directory, sort_method)[start_index:]
+    if image_load_cap > 0:
+        dir_files = dir_files[:image_load_cap]
+    if not dir_files:
+        raise FileNotFoundError(f"No image files in directory '{directory}'.")
+    return dir_files
+
+
+def _storage_dtype(compact_storage):
+    """
+    解码缓冲区（以及解码帧缓存）的 dtype：默认 float32，紧凑存储时为 uint8。
+    uint8 批次在 _as_image_output 中才转换为 float32（有 torch 时）或交给包装器按需转换（没有 torch 时）
+    """
+    return 'uint8' if compact_storage else 'float32'
+
+
+def _as_image_output(images):
+    """
+    numpy 批次 -> IMAGE 输出（有 torch 时转换为 tensor，否则零拷贝包装，两者形状都是 [N,H,W,C]）。
+    有 torch 时 float32 批次零拷贝转换；uint8 紧凑存储的批次在这里分块归一化进一次预分配的 float32 缓冲区，
+    下游节点拿到的始终是标准的 float32 IMAGE。没有 torch 时由使用方通过包装器的 numpy() / iter_float32() 按需转换
+    """
+    if torch is None:
+        return _NumpyTensorWrapper(images)
+    if images.dtype != np.float32:
+        images = _NumpyTensorWrapper(images).float32()
+    return torch.from_numpy(images)
+
+
+def _as_mask_output(masks, count, size=None):
+    """
+    numpy 遮罩批次 -> MASK 输出（有 torch 时零拷贝转换为 tensor）；
+    没有任何一帧带 alpha 时输出 [N,64,64] 全零遮罩（与 ComfyUI LoadImage 相同的约定），
+    传入 size=(height, width) 时改为该尺寸的全零遮罩（分块读取时与其它带 alpha 的块保持一致）
+    """
+    if masks is None:
+        height, width = size or (64, 64)
+        masks = np.zeros((count, height, width), dtype=np.float32)
+    if torch is not None:
+        return torch.from_numpy(masks)
+    return masks
+
+
+def iter_image_batches(directory, chunk_size, start_index=0, image_load_cap=0, decode_workers=0, frame_cache=False,
+                       sort_method=None, compact_storage=False, target_size=0):
+    """
+    分块读取图像目录，逐块产出 (IMAGE, MASK) 批次，供下游节点或脚本流式处理
+
+    每块单独预分配缓冲区，调用方释放上一块后内存即可回收，峰值内存约为一块的大小，
+    与目录总大小无关。所有块都缩放到目录首帧的尺寸，遮罩形状也在开始前按所选的全部文件决定
+    （只读取文件头），各块沿批次维度拼接后与 imaaaa 节点一次性读取的 IMAGE / MASK 一致。
+
+    Args:
+        directory: 图像目录
+        chunk_size: 每块的帧数
+        start_index / image_load_cap: 与 imaaaa 节点相同的分页参数
+        decode_workers: 解码线程数（0 为自动）
+        frame_cache: 是否使用解码帧磁盘缓存
+        sort_method: sort_methods 中的排序方式
+        compact_storage: 紧凑存储帧（见 _storage_dtype）
+        target_size: 输出帧最长边上限（0 为保持首帧尺寸），大图以缩小解码方式读取
+
+    Yields:
+        (images, masks): masks 在所选文件都没有 alpha 时每块为 [k,64,64] 全零遮罩，
+        否则每块都是 [k,H,W]（没有 alpha 的帧为全零）
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    dir_files = _select_image_files(directory, start_index, image_load_cap, sort_method)
+    size = _target_frame_size(dir_files[0], target_size)
+    cache = _frame_cache if frame_cache else None
+    mask_size = (size[1], size[0]) if any(_has_alpha(path) for path in dir_files) else None
+    for offset in range(0, len(dir_files), chunk_size):
+        images, masks = _decode_image_batch(dir_files[offset:offset + chunk_size], decode_workers, cache, size,
+                                            _storage_dtype(compact_storage), target_size > 0)
+        yield _as_image_output(images), _as_mask_output(masks, len(images), mask_size)
+        # 及时释放本块引用，避免生成器挂起期间同时持有两块
+        del images, masks
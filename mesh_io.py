@@ -0,0 +1,409 @@
+"""
+网格文件读取（OBJ / STL / PLY）
+输出 numpy 数组：positions (V, 3) float32，faces (F, 3) int32（多边形按扇形三角化）
+二进制 STL / PLY 通过 np.memmap 结构化 dtype 直接映射，OBJ 分块读取并整体向量化解析，均不逐行循环
+"""
+
+import os
+
+import numpy as np
+
+MESH_EXTENSIONS = ('.obj', '.stl', '.ply')
+
+# OBJ 分块读取的块大小（按行边界切分）
+OBJ_CHUNK_SIZE = 8 * 1024 * 1024
+
+# 二进制 STL 的三角形记录：法线、三个顶点、属性字节
+_STL_RECORD = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attr', '<u2')])
+
+# PLY 标量类型 -> numpy 类型
+_PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8',
+}
+
+_SPACE, _TAB, _CR, _LF = 32, 9, 13, 10
+
+
+class Mesh:
+    """
+    BB_MESH 类型：顶点与三角形数组，包围盒和法线按需批量计算并缓存
+
+    vertices: (V, 3) float32
+    faces: (F, 3) int32
+    """
+
+    __slots__ = ('vertices', 'faces', 'source', '_bounds', '_vertex_normals', '_face_normals')
+
+    def __init__(self, vertices, faces, source=None):
+        self.vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+        self.faces = np.ascontiguousarray(faces, dtype=np.int32)
+        self.source = source
+        self._bounds = None
+        self._vertex_normals = None
+        self._face_normals = None
+
+    @property
+    def num_vertices(self):
+        return len(self.vertices)
+
+    @property
+    def num_faces(self):
+        return len(self.faces)
+
+    @property
+    def bounds(self):
+        """(min, max)，各为 (3,) float32"""
+        if self._bounds is None:
+            self._bounds = compute_bounds(self.vertices)
+        return self._bounds
+
+    @property
+    def face_normals(self):
+        """(F, 3) 单位面法线"""
+        if self._face_normals is None:
+            normals = _face_cross(self.vertices, self.faces)
+            self._face_normals = _normalize(normals)
+        return self._face_normals
+
+    @property
+    def vertex_normals(self):
+        """(V, 3) 面积加权的单位顶点法线"""
+        if self._vertex_normals is None:
+            self._vertex_normals = vertex_normals(self.vertices, self.faces)
+        return self._vertex_normals
+
+    def __repr__(self):
+        lo, hi = self.bounds
+        return (f"Mesh(vertices={self.num_vertices}, faces={self.num_faces}, "
+                f"bounds={lo.tolist()}..{hi.tolist()})")
+
+
+def load_mesh(path, weld=False):
+    """
+    读取网格文件为 Mesh；weld=True 时合并重合顶点（STL 三角形汤焊接后顶点数约为原来的 1/6）
+    """
+    positions, faces = load_mesh_arrays(path)
+    if weld:
+        from .mesh_optimize import weld_vertices
+        positions, faces = weld_vertices(positions, faces)
+    return Mesh(positions, faces, source=path)
+
+
+def load_mesh_arrays(path):
+    """
+    读取网格文件
+
+    Returns:
+        (positions, faces): (V, 3) float32 与 (F, 3) int32
+    Raises:
+        ValueError: 格式不支持或文件损坏
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.stl':
+        return _read_stl(path)
+    if ext == '.ply':
+        return _read_ply(path)
+    if ext == '.obj':
+        return _read_obj(path)
+    raise ValueError(f"不支持的网格格式: {ext}")
+
+
+def compute_bounds(positions):
+    """
+    (V, 3) 顶点的 (min, max)
+    按列分别归约：(V, 3) 上的 axis=0 归约内层只有 3 个元素，比逐列慢约 5 倍
+    """
+    if len(positions) == 0:
+        return np.zeros(3, positions.dtype), np.zeros(3, positions.dtype)
+    lo = np.array([positions[:, axis].min() for axis in range(3)])
+    hi = np.array([positions[:, axis].max() for axis in range(3)])
+    return lo, hi
+
+
+def _face_cross(positions, faces):
+    p = positions.astype(np.float64, copy=False)
+    p0 = p[faces[:, 0]]
+    return np.cross(p[faces[:, 1]] - p0, p[faces[:, 2]] - p0)
+
+
+def _normalize(vectors):
+    length = np.linalg.norm(vectors, axis=1, keepdims=True)
+    length[length == 0] = 1.0
+    return (vectors / length).astype(np.float32)
+
+
+def vertex_normals(positions, faces):
+    """面积加权的顶点法线"""
+    face_normals = _face_cross(positions, faces)
+    normals = np.zeros((len(positions), 3), dtype=np.float64)
+    for axis in range(3):
+        for corner in range(3):
+            normals[:, axis] += np.bincount(faces[:, corner], weights=face_normals[:, axis], minlength=len(positions))
+    return _normalize(normals)
+
+
+def _triangle_soup(vertices):
+    """(F, 3, 3) 三角形顶点 -> 未焊接的 positions / faces"""
+    positions = np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1, 3)
+    faces = np.arange(len(positions), dtype=np.int32).reshape(-1, 3)
+    return positions, faces
+
+
+def _fan_triangulate(polygons):
+    """(F, K) 多边形顶点索引 -> (F*(K-2), 3) 扇形三角形"""
+    k = polygons.shape[1]
+    if k == 3:
+        return polygons
+    tris = [polygons[:, [0, i, i + 1]] for i in range(1, k - 1)]
+    return np.stack(tris, axis=1).reshape(-1, 3)
+
+
+def _read_stl(path):
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.read(84)
+    if len(header) == 84:
+        count = int(np.frombuffer(header, dtype='<u4', count=1, offset=80)[0])
+        if size == 84 + count * _STL_RECORD.itemsize:
+            if count == 0:
+                return np.zeros((0, 3), np.float32), np.zeros((0, 3), np.int32)
+            records = np.memmap(path, dtype=_STL_RECORD, mode='r', offset=84, shape=(count,))
+            try:
+                return _triangle_soup(records['vertices'])
+            finally:
+                del records
+    # ASCII STL：取每个 "vertex" 关键字后面的三个数
+    with open(path, 'rb') as f:
+        tokens = np.array(f.read().split())
+    starts = np.flatnonzero(tokens == b'vertex')
+    if len(starts) == 0 or len(starts) % 3:
+        raise ValueError("无法解析的 STL 文件")
+    coords = tokens[starts[:, None] + np.arange(1, 4)].astype(np.float32)
+    return _triangle_soup(coords.reshape(-1, 3, 3))
+
+
+def _read_ply_header(f):
+    if f.readline().strip() != b'ply':
+        raise ValueError("不是 PLY 文件")
+    fmt = None
+    elements = []
+    while True:
+        line = f.readline()
+        if not line:
+            raise ValueError("PLY 文件头不完整")
+        parts = line.decode('ascii', errors='ignore').split()
+        if not parts or parts[0] in ('comment', 'obj_info'):
+            continue
+        if parts[0] == 'end_header':
+            break
+        if parts[0] == 'format':
+            fmt = parts[1]
+        elif parts[0] == 'element':
+            elements.append({'name': parts[1], 'count': int(parts[2]), 'props': []})
+        elif parts[0] == 'property':
+            if parts[1] == 'list':
+                elements[-1]['props'].append((parts[4], 'list', _PLY_TYPES[parts[2]], _PLY_TYPES[parts[3]]))
+            else:
+                elements[-1]['props'].append((parts[2], _PLY_TYPES[parts[1]]))
+    return fmt, elements, f.tell()
+
+
+def _read_ply(path):
+    with open(path, 'rb') as f:
+        fmt, elements, offset = _read_ply_header(f)
+        if fmt == 'ascii':
+            return _read_ply_ascii(f, elements)
+    endian = '<' if fmt == 'binary_little_endian' else '>'
+    size = os.path.getsize(path)
+    positions = faces = None
+    for element in elements:
+        count = element['count']
+        if any(p[1] == 'list' for p in element['props']):
+            if element['name'] != 'face' or len(element['props']) != 1:
+                raise ValueError("暂不支持带有其它列表属性的 PLY")
+            _, _, count_type, index_type = element['props'][0]
+            count_dtype = np.dtype(endian + count_type)
+            first = np.fromfile(path, dtype=count_dtype, count=1, offset=offset)
+            k = int(first[0]) if len(first) else 3
+            dtype = np.dtype([('n', count_dtype), ('i', endian + index_type, (k,))])
+        else:
+            dtype = np.dtype([(name, endian + t) for name, t in element['props']])
+        if offset + dtype.itemsize * count > size:
+            raise ValueError("PLY 文件数据不完整（或面的边数不一致）")
+        if count:
+            records = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+            if element['name'] == 'vertex':
+                positions = np.empty((count, 3), dtype=np.float32)
+                for axis, name in enumerate('xyz'):
+                    positions[:, axis] = records[name]
+            elif element['name'] == 'face':
+                if not (records['n'] == k).all():
+                    raise ValueError("暂不支持混合边数的 PLY 面")
+                faces = _fan_triangulate(records['i'].astype(np.int32))
+            del records
+        offset += dtype.itemsize * count
+    if positions is None:
+        raise ValueError("PLY 文件中没有顶点")
+    if faces is None:
+        faces = np.zeros((0, 3), dtype=np.int32)
+    return positions, faces
+
+
+def _read_ply_ascii(f, elements):
+    lines = f.read().splitlines()
+    positions = faces = None
+    row = 0
+    for element in elements:
+        block = lines[row:row + element['count']]
+        row += element['count']
+        if element['name'] == 'vertex':
+            names = [p[0] for p in element['props']]
+            values = np.array(b' '.join(block).split(), dtype=np.float64).reshape(len(block), -1)
+            positions = values[:, [names.index('x'), names.index('y'), names.index('z')]].astype(np.float32)
+        elif element['name'] == 'face':
+            values = np.array(b' '.join(block).split(), dtype=np.int64).reshape(len(block), -1)
+            if len(values) and not (values[:, 0] == values.shape[1] - 1).all():
+                raise ValueError("暂不支持混合边数的 PLY 面")
+            faces = _fan_triangulate(values[:, 1:].astype(np.int32))
+    if positions is None:
+        raise ValueError("PLY 文件中没有顶点")
+    if faces is None:
+        faces = np.zeros((0, 3), dtype=np.int32)
+    return positions, faces
+
+
+def _iter_line_chunks(path, chunk_size=OBJ_CHUNK_SIZE):
+    """按块读取文件，每块在最后一个换行处切开，保证不跨行"""
+    tail = b''
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                if tail:
+                    yield tail + b'\n'
+                return
+            block = tail + block
+            cut = block.rfind(b'\n') + 1
+            tail = block[cut:]
+            if cut:
+                yield block[:cut]
+
+
+def _is_blank(chars):
+    return (chars == _SPACE) | (chars == _TAB) | (chars == _CR) | (chars == _LF)
+
+
+def _select_rows(buf, starts, lengths, mask, dtype, strip_slashes=False, indent=None):
+    """
+    取出被选中的行并解析为数值，返回 (去掉行首关键字后的全部数值, 每行数值个数)
+
+    indent: 每行关键字前的空白字节数（None 表示都没有缩进）
+
+    strip_slashes: 面的 "v/vt/vn" 只保留第一个索引
+    """
+    selected = buf[np.repeat(mask, lengths)]
+    if len(selected) == 0:
+        return np.zeros(0, dtype=dtype), np.zeros(0, dtype=np.int64)
+    row_starts = np.concatenate(([0], np.cumsum(lengths[mask])[:-1]))
+    # 行首关键字（v / f）只有一个字符，直接改为空格
+    selected[row_starts if indent is None else row_starts + indent[mask]] = _SPACE
+    blank = _is_blank(selected)
+    if strip_slashes:
+        slash = selected == ord('/')
+        if slash.any():
+            # 第一个 '/' 到下一个空白之间的字节都属于 vt / vn，改为空格
+            index = np.arange(len(selected), dtype=np.int32)
+            last_blank = np.maximum.accumulate(np.where(blank, index, 0))
+            last_slash = np.maximum.accumulate(np.where(slash, index, -1))
+            tail = last_slash > last_blank
+            selected[tail] = _SPACE
+            blank |= tail
+    token_start = ~blank
+    token_start[1:] &= blank[:-1]
+    tokens = np.flatnonzero(token_start)
+    counts = np.diff(np.searchsorted(tokens, np.append(row_starts, len(selected))))
+    values = np.fromstring(selected.tobytes(), dtype=dtype, sep=' ')
+    if len(values) != counts.sum():
+        raise ValueError("OBJ 文件中有无法解析的数值")
+    return values, counts
+
+
+def _gather_rows(values, counts, width):
+    """按每行的 token 数取出每行前 width 个值 -> (rows, width)"""
+    if len(counts) and (counts == width).all():
+        return values.reshape(-1, width)
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return values[offsets[:, None] + np.arange(width)]
+
+
+def _read_obj(path):
+    vertex_blocks = []
+    face_blocks = []
+    vertex_total = 0
+    for chunk in _iter_line_chunks(path):
+        buf = np.frombuffer(chunk, dtype=np.uint8)
+        line_feed = buf == _LF
+        ends = np.flatnonzero(line_feed) + 1
+        starts = np.concatenate(([0], ends[:-1]))
+        lengths = ends - starts
+        hashes = buf == ord('#')
+        if hashes.any():
+            # '#' 到行尾是注释（可以跟在 v / f 数据之后），在副本中改为空格
+            buf = buf.copy()
+            index = np.arange(len(buf), dtype=np.int64)
+            last_line_feed = np.maximum.accumulate(np.where(line_feed, index, -1))
+            last_hash = np.maximum.accumulate(np.where(hashes, index, -1))
+            buf[last_hash > last_line_feed] = _SPACE
+        # 每行第一个非空白字符的位置（允许缩进；空行取行尾的换行符）
+        lead, indent = starts, None
+        if (_is_blank(buf[starts]) & (buf[starts] != _LF)).any():
+            non_blank = np.append(np.flatnonzero(~_is_blank(buf)), len(buf))
+            lead = non_blank[np.searchsorted(non_blank, starts)]
+            lead = np.where(lead < ends, lead, ends - 1)
+            indent = lead - starts
+        # 关键字及其后一个字符判断行类型："v " 顶点，"f " 面（vt / vn / vp 等不匹配）
+        first = buf[lead]
+        second = buf[np.minimum(lead + 1, len(buf) - 1)]
+        separated = (second == _SPACE) | (second == _TAB)
+        is_vertex = (first == ord('v')) & separated
+        is_face = (first == ord('f')) & separated
+
+        if is_vertex.any():
+            values, counts = _select_rows(buf, starts, lengths, is_vertex, np.float32, indent=indent)
+            if (counts < 3).any():
+                raise ValueError("OBJ 顶点坐标不完整")
+            # 只取前三个坐标（忽略可选的 w 或顶点颜色）
+            vertex_blocks.append(_gather_rows(values, counts, 3))
+
+        if is_face.any():
+            # 每个面之前已出现的顶点数，用于解析负数（相对）索引
+            before = (np.cumsum(is_vertex) + vertex_total)[is_face]
+            indices, counts = _select_rows(buf, starts, lengths, is_face, np.int64, strip_slashes=True,
+                                           indent=indent)
+            offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            # 按边数分组向量化三角化，再按每个面在文件中的顺序写回（面数不足 3 的行不产生三角形）
+            tri_counts = np.maximum(counts - 2, 0)
+            tri_offsets = np.cumsum(tri_counts) - tri_counts
+            triangles = np.empty((int(tri_counts.sum()), 3), dtype=np.int64)
+            for k in np.unique(counts):
+                if k < 3:
+                    continue
+                rows = counts == k
+                idx = indices[offsets[rows][:, None] + np.arange(k)]
+                # OBJ 索引从 1 开始，负数表示相对当前已读顶点
+                idx = np.where(idx < 0, idx + before[rows][:, None], idx - 1)
+                triangles[(tri_offsets[rows][:, None] + np.arange(k - 2)).ravel()] = _fan_triangulate(idx)
+            face_blocks.append(triangles)
+
+        vertex_total += int(is_vertex.sum())
+
+    if not vertex_blocks:
+        raise ValueError("OBJ 文件中没有顶点")
+    positions = np.concatenate(vertex_blocks)
+    faces = np.concatenate(face_blocks).astype(np.int32) if face_blocks else np.zeros((0, 3), dtype=np.int32)
+    if len(faces) and (faces.min() < 0 or faces.max() >= len(positions)):
+        raise ValueError("OBJ 面索引超出顶点范围")
+    return positions, faces
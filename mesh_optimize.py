@@ -0,0 +1,248 @@
+"""
+服务器端网格预处理
+OBJ / STL / PLY -> 焊接顶点 -> 网格聚类减面生成多级 LOD -> 量化（KHR_mesh_quantization）写出紧凑 GLB
+结果按文件内容哈希缓存在 cache/meshes 下，查看器按屏幕大小请求合适的 LOD
+"""
+
+import hashlib
+import json
+import os
+import struct
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from .mesh_io import MESH_EXTENSIONS, compute_bounds, load_mesh_arrays, vertex_normals
+
+MESH_CACHE_DIR = Path(__file__).parent / "cache" / "meshes"
+
+# 缓存格式版本，修改输出格式时递增，旧缓存自动失效
+MESH_CACHE_VERSION = 1
+
+# 焊接容差（相对于包围盒最长边）
+WELD_TOLERANCE = 1e-6
+
+# 各级 LOD 的聚类网格分辨率（沿最长边的格子数），LOD 0 为焊接后的原始精度
+LOD_GRID_RESOLUTIONS = (512, 192, 64)
+
+# 减面效果不足时（三角形数超过上一级的该比例）不再生成更粗的 LOD
+LOD_MIN_REDUCTION = 0.8
+
+_GLB_MAGIC = 0x46546C67
+_GLB_JSON = 0x4E4F534A
+_GLB_BIN = 0x004E4942
+
+# 内容哈希缓存：(path, mtime_ns, size) -> sha1，避免每次请求都重新读文件
+_content_hashes = {}
+_build_locks = {}
+_build_locks_guard = threading.Lock()
+
+
+def _bounds(positions):
+    lo, hi = compute_bounds(positions)
+    lo, hi = lo.astype(np.float64), hi.astype(np.float64)
+    return lo, hi, float((hi - lo).max()) or 1.0
+
+
+def _drop_degenerate(faces):
+    keep = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])
+    return faces[keep]
+
+
+def _compact(positions, faces):
+    """去掉未被引用的顶点并重新编号"""
+    used, faces = np.unique(faces, return_inverse=True)
+    return positions[used], faces.reshape(-1, 3)
+
+
+def weld_vertices(positions, faces, tolerance=WELD_TOLERANCE):
+    """
+    合并位置相同（容差内）的顶点，STL 等三角形汤焊接后顶点数约为原来的 1/6
+    """
+    if len(positions) == 0:
+        return positions, faces
+    lo, _, extent = _bounds(positions)
+    # 每轴量化到 21 位，三轴打包为一个 int64 键
+    grid = np.rint((positions - lo) / (extent * tolerance)).astype(np.int64)
+    np.minimum(grid, (1 << 21) - 1, out=grid)
+    keys = (grid[:, 0] << 42) | (grid[:, 1] << 21) | grid[:, 2]
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    faces = _drop_degenerate(inverse.reshape(-1)[faces])
+    return _compact(positions[first], faces)
+
+
+def cluster_decimate(positions, faces, resolution):
+    """
+    网格聚类减面：同一格子内的顶点合并到其平均位置，删除退化和重复的三角形
+    """
+    if len(faces) == 0:
+        return positions, faces
+    lo, _, extent = _bounds(positions)
+    grid = np.minimum(((positions - lo) * (resolution / extent)).astype(np.int64), resolution)
+    side = resolution + 1
+    keys = (grid[:, 0] * side + grid[:, 1]) * side + grid[:, 2]
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    counts = np.bincount(inverse, minlength=len(uniq)).astype(np.float64)
+    centers = np.stack([
+        np.bincount(inverse, weights=positions[:, axis], minlength=len(uniq)) for axis in range(3)
+    ], axis=1) / counts[:, None]
+
+    faces = _drop_degenerate(inverse[faces])
+    # 顶点集合相同的三角形只保留第一个（保持原有绕序）
+    rows = np.ascontiguousarray(np.sort(faces, axis=1))
+    _, first = np.unique(rows.view(np.dtype((np.void, rows.dtype.itemsize * 3))).reshape(-1), return_index=True)
+    faces = faces[np.sort(first)]
+    return _compact(centers.astype(np.float32), faces)
+
+
+def _pad4(data, fill=b'\x00'):
+    return data + fill * (-len(data) % 4)
+
+
+def write_glb(positions, faces, normals=None):
+    """
+    写出量化 GLB：位置 int16、法线 int8（均为 normalized），反量化交给节点的 translation / scale
+    顶点属性按 glTF 要求 4 字节对齐（位置步长 8，法线步长 4）
+    """
+    if normals is None:
+        normals = vertex_normals(positions, faces)
+    count = len(positions)
+    lo, hi, _ = _bounds(positions) if count else (np.zeros(3), np.zeros(3), 1.0)
+    center = (lo + hi) / 2
+    # 统一缩放，避免非均匀缩放扭曲法线
+    half = float((hi - lo).max()) / 2 or 1.0
+
+    qpos = np.zeros((count, 4), dtype=np.int16)
+    qpos[:, :3] = np.rint((positions - center) / half * 32767)
+    qnorm = np.zeros((count, 4), dtype=np.int8)
+    qnorm[:, :3] = np.rint(normals * 127)
+    # uint16 的最大值保留给图元重启，不能作为索引
+    index_type, component = (np.uint16, 5123) if count < 0xFFFF else (np.uint32, 5125)
+
+    index_bytes = _pad4(faces.astype(index_type).tobytes())
+    pos_bytes = qpos.tobytes()
+    norm_bytes = qnorm.tobytes()
+    binary = index_bytes + pos_bytes + norm_bytes
+
+    pos_min = qpos[:, :3].min(axis=0).tolist() if count else [0, 0, 0]
+    pos_max = qpos[:, :3].max(axis=0).tolist() if count else [0, 0, 0]
+    gltf = {
+        'asset': {'version': '2.0', 'generator': 'ComfyUI_3DViewer'},
+        'extensionsUsed': ['KHR_mesh_quantization'],
+        'extensionsRequired': ['KHR_mesh_quantization'],
+        'scene': 0,
+        'scenes': [{'nodes': [0]}],
+        'nodes': [{'mesh': 0, 'translation': center.tolist(), 'scale': [half, half, half]}],
+        'meshes': [{'primitives': [{'attributes': {'POSITION': 1, 'NORMAL': 2}, 'indices': 0, 'material': 0}]}],
+        'materials': [{'pbrMetallicRoughness': {
+            'baseColorFactor': [0.8, 0.8, 0.8, 1.0], 'metallicFactor': 0.0, 'roughnessFactor': 0.8}}],
+        'buffers': [{'byteLength': len(binary)}],
+        'bufferViews': [
+            {'buffer': 0, 'byteOffset': 0, 'byteLength': faces.size * np.dtype(index_type).itemsize, 'target': 34963},
+            {'buffer': 0, 'byteOffset': len(index_bytes), 'byteLength': len(pos_bytes), 'byteStride': 8, 'target': 34962},
+            {'buffer': 0, 'byteOffset': len(index_bytes) + len(pos_bytes), 'byteLength': len(norm_bytes),
+             'byteStride': 4, 'target': 34962},
+        ],
+        'accessors': [
+            {'bufferView': 0, 'componentType': component, 'count': int(faces.size), 'type': 'SCALAR'},
+            {'bufferView': 1, 'componentType': 5122, 'normalized': True, 'count': count, 'type': 'VEC3',
+             'min': pos_min, 'max': pos_max},
+            {'bufferView': 2, 'componentType': 5120, 'normalized': True, 'count': count, 'type': 'VEC3'},
+        ],
+    }
+    json_bytes = _pad4(json.dumps(gltf, separators=(',', ':')).encode('utf-8'), b' ')
+    length = 12 + 8 + len(json_bytes) + 8 + len(binary)
+    return b''.join([
+        struct.pack('<III', _GLB_MAGIC, 2, length),
+        struct.pack('<II', len(json_bytes), _GLB_JSON), json_bytes,
+        struct.pack('<II', len(binary), _GLB_BIN), binary,
+    ])
+
+
+def build_lods(positions, faces):
+    """
+    生成各级 LOD 的 (positions, faces)，LOD 0 为焊接后的原始网格
+    """
+    positions, faces = weld_vertices(positions, faces)
+    levels = [(positions, faces)]
+    for resolution in LOD_GRID_RESOLUTIONS:
+        prev_faces = len(levels[-1][1])
+        lod_positions, lod_faces = cluster_decimate(positions, faces, resolution)
+        if len(lod_faces) == 0 or len(lod_faces) > prev_faces * LOD_MIN_REDUCTION:
+            continue
+        levels.append((lod_positions, lod_faces))
+    return levels
+
+
+def _content_hash(path):
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    digest = _content_hashes.get(key)
+    if digest is None:
+        h = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        _content_hashes[key] = digest
+    return digest
+
+
+def _build_lock(digest):
+    with _build_locks_guard:
+        return _build_locks.setdefault(digest, threading.Lock())
+
+
+def get_mesh_lods(path):
+    """
+    返回网格文件的 LOD 信息（必要时生成并写入缓存）
+
+    Returns:
+        dict: {'hash': ..., 'levels': [{'lod', 'vertices', 'triangles', 'bytes', 'file'}, ...]}，
+        levels 按从精细到粗糙排列
+    """
+    digest = f"{_content_hash(path)}_v{MESH_CACHE_VERSION}"
+    meta_path = MESH_CACHE_DIR / f"{digest}.json"
+    with _build_lock(digest):
+        if meta_path.exists():
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                if all((MESH_CACHE_DIR / level['file']).exists() for level in meta['levels']):
+                    return meta
+            except (OSError, ValueError, KeyError):
+                pass
+
+        positions, faces = load_mesh_arrays(path)
+        MESH_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        levels = []
+        for lod, (lod_positions, lod_faces) in enumerate(build_lods(positions, faces)):
+            data = write_glb(lod_positions, lod_faces)
+            name = f"{digest}_lod{lod}.glb"
+            tmp_path = MESH_CACHE_DIR / f".{name}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, MESH_CACHE_DIR / name)
+            levels.append({'lod': lod, 'vertices': int(len(lod_positions)),
+                           'triangles': int(len(lod_faces)), 'bytes': len(data), 'file': name})
+        meta = {'hash': digest, 'source_triangles': int(len(faces)), 'levels': levels}
+        tmp_path = MESH_CACHE_DIR / f".{digest}.json.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+        return meta
+
+
+def get_mesh_lod_file(path, lod):
+    """
+    返回指定 LOD 的 GLB 缓存路径，lod 超出范围时取最粗的一级
+    """
+    levels = get_mesh_lods(path)['levels']
+    level = levels[max(0, min(int(lod), len(levels) - 1))]
+    return str(MESH_CACHE_DIR / level['file'])
+
+
+def is_mesh_file(path):
+    return os.path.splitext(path)[1].lower() in MESH_EXTENSIONS
@@ -0,0 +1,292 @@
+"""
+无浏览器的 CPU 软件光栅化（NumPy 向量化）：z-buffer + Lambert / Phong 着色
+相机约定与查看器一致：方位角以 +z 为 0、顺时针为正，fov 为垂直视场角（setCameraFov），
+模型按 modelTargetSize 统一缩放，距离单位与 computeShotScale 相同
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+# 与查看器默认值一致
+MODEL_TARGET_SIZE = 1.0
+NEAR_PLANE = 0.1
+# 灯光：环境光 0x404040 * 0.6，半球光 0x888877 / 0x444455 * 0.4，方向光 白色 * 0.8 位于 (10, 10, 5)
+AMBIENT_LIGHT = np.array([0x40, 0x40, 0x40], np.float32) / 255.0 * 0.6
+HEMI_SKY = np.array([0x88, 0x88, 0x77], np.float32) / 255.0 * 0.4
+HEMI_GROUND = np.array([0x44, 0x44, 0x55], np.float32) / 255.0 * 0.4
+DIRECTIONAL_LIGHT = 0.8
+DIRECTIONAL_POSITION = (10.0, 10.0, 5.0)
+SHININESS = 30.0
+SPECULAR_STRENGTH = 0.25
+
+SHADING_MODES = ["phong", "lambert"]
+
+# 每批光栅化的候选片元数上限（控制临时数组的内存占用）
+FRAGMENT_BUDGET = 1 << 20
+# 每批着色的像素数（每个像素的临时数据约为光栅化片元的数倍）
+SHADE_CHUNK = 1 << 18
+
+# computeShotScale 的景别阈值（以 modelTargetSize 为单位）
+_SHOT_SCALES = (
+    (0.8, 'Close-up'),
+    (1.6, 'Near shot'),
+    (3.0, 'Medium close-up'),
+    (6.0, 'Medium shot'),
+    (12.0, 'Wide shot'),
+)
+
+
+def shot_scale(distance, unit=MODEL_TARGET_SIZE):
+    """与查看器 computeShotScale 相同的景别划分"""
+    unit = max(0.0001, unit)
+    for limit, label in _SHOT_SCALES:
+        if distance <= limit * unit:
+            return label
+    return 'Long shot'
+
+
+def fov_from_focal_length(focal_length_mm, sensor_height_mm=24.0):
+    """35mm 等效焦距 -> 垂直 FOV（度），与 setCameraFocalLengthMm 相同"""
+    return math.degrees(2 * math.atan((sensor_height_mm / 2) / focal_length_mm))
+
+
+def parse_color(value, default=(1.0, 1.0, 1.0)):
+    """'#rrggbb' / 'rrggbb' -> (r, g, b) 浮点数；无法解析时返回 default"""
+    text = str(value or '').strip().lstrip('#')
+    if len(text) == 3:
+        text = ''.join(c * 2 for c in text)
+    try:
+        return tuple(int(text[i:i + 2], 16) / 255.0 for i in (0, 2, 4)) if len(text) == 6 else default
+    except ValueError:
+        return default
+
+
+def normalize_to_viewer(vertices, target_size=MODEL_TARGET_SIZE):
+    """与查看器 addModelToScene 相同：包围盒居中并把最长边缩放到 target_size"""
+    vertices = np.asarray(vertices, dtype=np.float32)
+    if len(vertices) == 0:
+        return vertices
+    lo = np.array([vertices[:, axis].min() for axis in range(3)])
+    hi = np.array([vertices[:, axis].max() for axis in range(3)])
+    size = float((hi - lo).max()) or 1.0
+    return ((vertices - (lo + hi) / 2) * (target_size / size)).astype(np.float32)
+
+
+def orbit_eye(azimuth, elevation, distance, target=(0.0, 0.0, 0.0)):
+    """与 applyCaptureCamera 相同的环绕相机位置"""
+    az = math.radians(azimuth)
+    el = math.radians(elevation)
+    tx, ty, tz = target
+    return np.array([
+        tx + distance * math.cos(el) * math.sin(az),
+        ty + distance * math.sin(el),
+        tz + distance * math.cos(el) * math.cos(az),
+    ], dtype=np.float64)
+
+
+def _look_at(eye, target):
+    """世界 -> 相机的旋转矩阵（相机看向 -z，y 向上，与 three.js 相同）"""
+    forward = np.asarray(target, np.float64) - eye
+    forward /= np.linalg.norm(forward) or 1.0
+    up = np.array([0.0, 1.0, 0.0])
+    if abs(forward @ up) > 0.999:
+        # 正上方/正下方俯视时改用 z 轴作为参考，避免退化
+        up = np.array([0.0, 0.0, -1.0 if forward[1] < 0 else 1.0])
+    right = np.cross(forward, up)
+    right /= np.linalg.norm(right)
+    true_up = np.cross(right, forward)
+    return np.stack([right, true_up, -forward])
+
+
+def _to_uint8(color):
+    return (np.clip(color, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+
+
+def _rasterize(sx, sy, invz, faces, width, height):
+    """
+    z-buffer 光栅化，返回每个像素最近的三角形编号（背景为 -1）与该处的 1/z
+
+    三角形按包围盒大小分组，每组在固定大小的候选像素网格上整体计算重心坐标，
+    每批片元先按像素取最近者，再与 z-buffer 比较写入。包围盒超过 FRAGMENT_BUDGET 个像素的大三角形
+    按候选网格大小分块处理，任何一批的候选片元数都不超过 FRAGMENT_BUDGET
+    """
+    pixels = width * height
+    depth = np.zeros(pixels, np.float32)
+    tri_ids = np.full(pixels, -1, np.int64)
+
+    x = sx[faces]
+    y = sy[faces]
+    iz = invz[faces]
+    area = (x[:, 1] - x[:, 0]) * (y[:, 2] - y[:, 0]) - (x[:, 2] - x[:, 0]) * (y[:, 1] - y[:, 0])
+    # 像素 i 的中心在 i + 0.5
+    x0 = np.maximum(np.ceil(x.min(axis=1) - 0.5), 0).astype(np.int64)
+    x1 = np.minimum(np.floor(x.max(axis=1) - 0.5), width - 1).astype(np.int64)
+    y0 = np.maximum(np.ceil(y.min(axis=1) - 0.5), 0).astype(np.int64)
+    y1 = np.minimum(np.floor(y.max(axis=1) - 0.5), height - 1).astype(np.int64)
+    visible = np.flatnonzero((x1 >= x0) & (y1 >= y0) & (area != 0) & (iz > 0).all(axis=1))
+    if len(visible) == 0:
+        return tri_ids, depth
+
+    extent = np.maximum(x1 - x0, y1 - y0)[visible] + 1
+    size_class = np.ceil(np.log2(extent)).astype(np.int64)
+    # 候选网格边长上限（side * side 不超过 FRAGMENT_BUDGET）
+    max_class = (FRAGMENT_BUDGET.bit_length() - 1) // 2
+    for cls in np.unique(size_class):
+        side = 1 << int(min(cls, max_class))
+        oy, ox = np.divmod(np.arange(side * side), side)
+        group = visible[size_class == cls]
+        # 每个任务是 (三角形, 分块偏移)；包围盒之外的分块直接丢弃
+        tiles = 1 << int(cls - min(cls, max_class))
+        tile_y, tile_x = np.divmod(np.arange(tiles * tiles), tiles)
+        tasks = np.repeat(group, tiles * tiles)
+        off_x = np.tile(tile_x * side, len(group))
+        off_y = np.tile(tile_y * side, len(group))
+        if tiles > 1:
+            keep = (x0[tasks] + off_x <= x1[tasks]) & (y0[tasks] + off_y <= y1[tasks])
+            tasks, off_x, off_y = tasks[keep], off_x[keep], off_y[keep]
+        step = max(1, FRAGMENT_BUDGET // (side * side))
+        for begin in range(0, len(tasks), step):
+            t = tasks[begin:begin + step]
+            px = x0[t, None] + off_x[begin:begin + step, None] + ox
+            py = y0[t, None] + off_y[begin:begin + step, None] + oy
+            cx = px + 0.5
+            cy = py + 0.5
+            tx, ty, ta = x[t], y[t], area[t, None]
+            w0 = ((tx[:, 2, None] - tx[:, 1, None]) * (cy - ty[:, 1, None])
+                  - (ty[:, 2, None] - ty[:, 1, None]) * (cx - tx[:, 1, None])) / ta
+            w1 = ((tx[:, 0, None] - tx[:, 2, None]) * (cy - ty[:, 2, None])
+                  - (ty[:, 0, None] - ty[:, 2, None]) * (cx - tx[:, 2, None])) / ta
+            w2 = 1.0 - w0 - w1
+            inside = (px <= x1[t, None]) & (py <= y1[t, None]) & (w0 >= 0) & (w1 >= 0) & (w2 >= 0)
+            if not inside.any():
+                continue
+            frag_iz = (w0 * iz[t, 0, None] + w1 * iz[t, 1, None] + w2 * iz[t, 2, None])[inside]
+            frag_pix = (py * width + px)[inside]
+            frag_tri = np.broadcast_to(t[:, None], inside.shape)[inside]
+            # 同一像素保留最近（1/z 最大）的片元
+            order = np.lexsort((-frag_iz, frag_pix))
+            frag_pix = frag_pix[order]
+            first = np.ones(len(order), bool)
+            first[1:] = frag_pix[1:] != frag_pix[:-1]
+            best = order[first]
+            frag_pix = frag_pix[first]
+            closer = frag_iz[best] > depth[frag_pix]
+            frag_pix = frag_pix[closer]
+            depth[frag_pix] = frag_iz[best[closer]]
+            tri_ids[frag_pix] = frag_tri[best[closer]]
+    return tri_ids, depth
+
+
+def render_view(vertices, faces, normals, eye, target=(0.0, 0.0, 0.0), fov=75.0, width=512, height=512,
+                shading="phong", color=(0.8, 0.8, 0.8), background=(1.0, 1.0, 1.0)):
+    """
+    渲染单个视角，返回 (height, width, 3) uint8
+
+    vertices / normals: (V, 3) 世界坐标下的顶点与单位顶点法线；faces: (F, 3)
+    """
+    eye = np.asarray(eye, np.float64)
+    rotation = _look_at(eye, target)
+    cam = (vertices.astype(np.float64) - eye) @ rotation.T
+    z = -cam[:, 2]
+    focal = 1.0 / math.tan(math.radians(fov) / 2)
+    aspect = width / height
+    with np.errstate(divide='ignore', invalid='ignore'):
+        invz = np.where(z > NEAR_PLANE, 1.0 / z, 0.0)
+        sx = (cam[:, 0] * invz * (focal / aspect) + 1.0) * (width / 2)
+        sy = (1.0 - cam[:, 1] * invz * focal) * (height / 2)
+
+    tri_ids, depth = _rasterize(sx, sy, invz, faces, width, height)
+    image = np.empty((height * width, 3), np.uint8)
+    image[:] = _to_uint8(np.asarray(background, np.float64))
+    light_dir = np.asarray(DIRECTIONAL_POSITION, np.float64)
+    light_dir /= np.linalg.norm(light_dir)
+    covered_all = np.flatnonzero(tri_ids >= 0)
+    # 分块着色，临时数组大小与输出分辨率无关
+    for begin in range(0, len(covered_all), SHADE_CHUNK):
+        covered = covered_all[begin:begin + SHADE_CHUNK]
+        tri = faces[tri_ids[covered]]
+        # 透视校正的重心坐标（在屏幕空间按 1/z 插值）
+        cx = (covered % width) + 0.5
+        cy = (covered // width) + 0.5
+        x, y = sx[tri], sy[tri]
+        area = (x[:, 1] - x[:, 0]) * (y[:, 2] - y[:, 0]) - (x[:, 2] - x[:, 0]) * (y[:, 1] - y[:, 0])
+        b0 = ((x[:, 2] - x[:, 1]) * (cy - y[:, 1]) - (y[:, 2] - y[:, 1]) * (cx - x[:, 1])) / area
+        b1 = ((x[:, 0] - x[:, 2]) * (cy - y[:, 2]) - (y[:, 0] - y[:, 2]) * (cx - x[:, 2])) / area
+        bary = np.stack([b0, b1, 1.0 - b0 - b1], axis=1) * invz[tri] / depth[covered, None]
+
+        n = np.einsum('pk,pkc->pc', bary, normals[tri].astype(np.float64))
+        n /= np.maximum(np.linalg.norm(n, axis=1, keepdims=True), 1e-12)
+        point = np.einsum('pk,pkc->pc', bary, vertices[tri].astype(np.float64))
+        view_dir = eye - point
+        view_dir /= np.maximum(np.linalg.norm(view_dir, axis=1, keepdims=True), 1e-12)
+        # 双面着色：法线背向相机时翻转
+        n *= np.where((n * view_dir).sum(axis=1) < 0, -1.0, 1.0)[:, None]
+
+        diffuse = np.maximum(n @ light_dir, 0.0)[:, None] * DIRECTIONAL_LIGHT
+        hemi = (n[:, 1:2] * 0.5 + 0.5) * HEMI_SKY + (0.5 - n[:, 1:2] * 0.5) * HEMI_GROUND
+        shaded = np.asarray(color, np.float64) * (AMBIENT_LIGHT + hemi + diffuse)
+        if shading == "phong":
+            # Blinn-Phong 高光（与 MeshPhongMaterial 相同的半角向量形式）
+            half = view_dir + light_dir
+            half /= np.maximum(np.linalg.norm(half, axis=1, keepdims=True), 1e-12)
+            specular = np.maximum((n * half).sum(axis=1), 0.0) ** SHININESS * SPECULAR_STRENGTH * DIRECTIONAL_LIGHT
+            shaded += specular[:, None]
+        image[covered] = _to_uint8(shaded)
+    return image.reshape(height, width, 3)
+
+
+# 为 True 时 render_orbit 默认使用进程池（需显式开启）
+RENDER_PROCESSES = os.environ.get('BB3D_RENDER_PROCESSES', '').strip().lower() in ('1', 'true', 'yes')
+
+# 工作进程中的网格数据（通过 initializer 每个进程只传一次）
+_worker_mesh = None
+
+
+def _init_worker(vertices, faces, normals):
+    global _worker_mesh
+    _worker_mesh = (vertices, faces, normals)
+
+
+def _render_task(args):
+    eye, options = args
+    vertices, faces, normals = _worker_mesh
+    return render_view(vertices, faces, normals, eye, **options)
+
+
+def render_orbit(vertices, faces, normals, cameras, workers=0, processes=None, **options):
+    """
+    渲染多个视角，cameras 为相机位置列表，返回 (N, height, width, 3) uint8
+
+    workers: 0 自动（不超过 CPU 数与视角数），1 在当前进程中逐个渲染；
+    默认使用线程池（NumPy 运算大多会释放 GIL，且不会在 ComfyUI 进程内派生子进程）。
+    processes=True（或环境变量 BB3D_RENDER_PROCESSES=1）时改用进程池，
+    进程池不可用时（例如模块无法在子进程中导入）退回线程池
+    """
+    height, width = options.get('height', 512), options.get('width', 512)
+    batch = np.empty((len(cameras), height, width, 3), np.uint8)
+    if workers <= 0:
+        workers = min(len(cameras), os.cpu_count() or 1)
+    if workers <= 1 or len(cameras) <= 1:
+        for k, eye in enumerate(cameras):
+            batch[k] = render_view(vertices, faces, normals, eye, **options)
+        return batch
+    if RENDER_PROCESSES if processes is None else processes:
+        tasks = [(eye, options) for eye in cameras]
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(vertices, faces, normals)) as pool:
+                for k, frame in enumerate(pool.map(_render_task, tasks)):
+                    batch[k] = frame
+            return batch
+        except Exception as e:
+            print(f"多进程渲染不可用，改用线程池: {e}")
+
+    def render(k):
+        batch[k] = render_view(vertices, faces, normals, cameras[k], **options)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(render, range(len(cameras))))
+    return batch
@@ -0,0 +1,285 @@
+"""
+运行指标与性能剖析（仅依赖标准库）
+
+- MetricsRegistry：线程安全的计数器 / 直方图注册表，另可注册在导出时求值的仪表（gauge）回调；
+  render() 输出 Prometheus 文本格式（查看器服务器的 /metrics），snapshot() 返回进程内统计字典
+- 节点剖析：设置环境变量 BB3D_PROFILE（逗号分隔的节点类名，或 all）后，对应节点每次执行都会用
+  cProfile 和/或 tracemalloc（BB3D_PROFILE_MODE，默认 cprofile）剖析，结果写入 cache/profiles/；
+  也可在进程内调用 set_profiling() 开关
+"""
+
+import bisect
+import contextlib
+import functools
+import os
+import threading
+import time
+from pathlib import Path
+
+# 默认直方图分桶（秒），覆盖从毫秒级 API 请求到数十秒的长轮询 / 批量解码
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+PROFILE_DIR = Path(__file__).parent / "cache" / "profiles"
+PROFILE_MODES = ('cprofile', 'tracemalloc')
+# tracemalloc 报告中列出的分配位置数
+TRACEMALLOC_TOP = 30
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    计数器 / 直方图 / 仪表注册表。指标在首次 inc()/observe() 时按名称 + 标签自动创建，
+    describe() 为指标补充 HELP 文本（可选）；仪表由 register_gauge() 的回调在导出时求值
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._help = {}
+        # name -> {label key: value}
+        self._counters = {}
+        # name -> {label key: {'buckets': [...], 'sum', 'count', 'max'}}
+        self._histograms = {}
+        # name -> callback() -> [(labels dict, value)]
+        self._gauges = {}
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def inc(self, name, value=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0, 'max': 0.0}
+                series[key] = hist
+            if index < len(self.buckets):
+                hist['buckets'][index] += 1
+            hist['sum'] += value
+            hist['count'] += 1
+            if value > hist['max']:
+                hist['max'] = value
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        """with registry.timer(name, stage=...): 把代码块耗时记录到直方图 name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def register_gauge(self, name, help_text, callback):
+        """注册仪表：callback() 返回 [(labels dict, value)]，每次导出时调用"""
+        self._help[name] = help_text
+        self._gauges[name] = callback
+
+    def _collect_gauges(self):
+        gauges = {}
+        for name, callback in list(self._gauges.items()):
+            try:
+                gauges[name] = [(_label_key(labels), value) for labels, value in callback()]
+            except Exception as e:
+                print(f"指标 {name} 采集失败: {e}")
+        return gauges
+
+    def snapshot(self):
+        """
+        进程内统计快照
+
+        Returns:
+            dict: {'counters': {name: {labels: value}}, 'histograms': {name: {labels: {count, sum, mean, max,
+            buckets}}}, 'gauges': {name: {labels: value}}}；labels 为 'k=v,...' 字符串（无标签时为 ''）
+        """
+        def label_str(key):
+            return ','.join(f'{k}={v}' for k, v in key)
+
+        with self._lock:
+            counters = {n: {label_str(k): v for k, v in s.items()} for n, s in self._counters.items()}
+            histograms = {}
+            for name, series in self._histograms.items():
+                histograms[name] = {
+                    label_str(k): {
+                        'count': h['count'],
+                        'sum': h['sum'],
+                        'mean': h['sum'] / h['count'] if h['count'] else 0.0,
+                        'max': h['max'],
+                        'buckets': dict(zip(self.buckets, h['buckets'])),
+                    }
+                    for k, h in series.items()
+                }
+        gauges = {n: {label_str(k): v for k, v in s} for n, s in self._collect_gauges().items()}
+        return {'counters': counters, 'histograms': histograms, 'gauges': gauges}
+
+    def render(self):
+        """Prometheus 文本格式（text/plain; version=0.0.4）"""
+        lines = []
+
+        def header(name, kind):
+            if name in self._help:
+                lines.append(f'# HELP {name} {self._help[name]}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        with self._lock:
+            counters = {n: dict(s) for n, s in self._counters.items()}
+            histograms = {n: {k: dict(h, buckets=list(h['buckets'])) for k, h in s.items()}
+                          for n, s in self._histograms.items()}
+        for name in sorted(counters):
+            header(name, 'counter')
+            for key, value in sorted(counters[name].items()):
+                lines.append(f'{name}{_format_labels(key)} {_format_value(value)}')
+        for name in sorted(histograms):
+            header(name, 'histogram')
+            for key, hist in sorted(histograms[name].items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, hist['buckets']):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_format_labels(key, [("le", _format_value(float(bound)))])} {cumulative}')
+                lines.append(f'{name}_bucket{_format_labels(key, [("le", "+Inf")])} {hist["count"]}')
+                lines.append(f'{name}_sum{_format_labels(key)} {_format_value(hist["sum"])}')
+                lines.append(f'{name}_count{_format_labels(key)} {hist["count"]}')
+        gauges = self._collect_gauges()
+        for name in sorted(gauges):
+            header(name, 'gauge')
+            for key, value in sorted(gauges[name]):
+                lines.append(f'{name}{_format_labels(key)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+# 进程级默认注册表：查看器服务器与各节点共用，/metrics 导出的即是它
+REGISTRY = MetricsRegistry()
+
+
+#
+# 节点剖析
+#
+def _parse_profile_env():
+    nodes = {n.strip() for n in os.environ.get('BB3D_PROFILE', '').split(',') if n.strip()}
+    modes = {m.strip().lower() for m in os.environ.get('BB3D_PROFILE_MODE', 'cprofile').split(',') if m.strip()}
+    return nodes, modes & set(PROFILE_MODES) or {'cprofile'}
+
+
+_profile_nodes, _profile_modes = _parse_profile_env()
+_profile_lock = threading.Lock()
+
+
+def set_profiling(nodes=(), modes=('cprofile',)):
+    """
+    开关节点剖析
+
+    Args:
+        nodes: 要剖析的节点类名（'all' 表示全部），空表示关闭
+        modes: 'cprofile' 和/或 'tracemalloc'
+    """
+    global _profile_nodes, _profile_modes
+    unknown = set(modes) - set(PROFILE_MODES)
+    if unknown:
+        raise ValueError(f"未知的剖析方式: {sorted(unknown)}（可选 {PROFILE_MODES}）")
+    _profile_nodes = set(nodes)
+    _profile_modes = set(modes)
+
+
+def _profiling_enabled(node_name):
+    return bool(_profile_nodes) and ('all' in _profile_nodes or node_name in _profile_nodes)
+
+
+def _run_profiled(node_name, func, args, kwargs):
+    # 剖析模块只在启用时导入（tracemalloc 会连带导入 pickle 等，不计入插件的启动时间）
+    import cProfile
+    import tracemalloc
+    modes = set(_profile_modes)
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stem = PROFILE_DIR / f"{node_name}_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{time.monotonic_ns() % 1000000:06d}"
+    profiler = cProfile.Profile() if 'cprofile' in modes else None
+    # 同一时刻只剖析一个节点执行（cProfile / tracemalloc 都是进程级的）
+    with _profile_lock:
+        started_tracing = False
+        if 'tracemalloc' in modes:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            if hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+
+                tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            if profiler is not None:
+                try:
+                    profiler.enable()
+                except ValueError:
+                    # 已有其它 profiler 在运行（例如外部 cProfile）
+                    profiler = None
+            try:
+                return func(*args, **kwargs)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+        finally:
+            elapsed = time.perf_counter() - start
+            written = []
+            if profiler is not None:
+                profiler.dump_stats(f"{stem}.prof")
+                written.append(f"{stem}.prof")
+            if 'tracemalloc' in modes and tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                stats = tracemalloc.take_snapshot().statistics('lineno')
+                if started_tracing:
+                    tracemalloc.stop()
+                with open(f"{stem}.tracemalloc.txt", 'w', encoding='utf-8') as f:
+                    f.write(f"# {node_name}: {elapsed:.3f}s, current={current / 2**20:.1f}MiB, peak={peak / 2**20:.1f}MiB\n")
+                    for stat in stats[:TRACEMALLOC_TOP]:
+                        f.write(f"{stat}\n")
+                written.append(f"{stem}.tracemalloc.txt")
+            if written:
+                print(f"🔵BB 剖析 {node_name}（{elapsed:.3f}s）: {', '.join(written)}")
+
+
+def profiled(node_name, func):
+    """包装节点函数：未启用剖析时直接调用，启用时按当前设置剖析这次执行"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _profiling_enabled(node_name):
+            return func(*args, **kwargs)
+        return _run_profiled(node_name, func, args, kwargs)
+    return wrapper
+
+
+def install_node_profiling(node_class_mappings):
+    """
+    为每个节点类的 FUNCTION 方法安装剖析包装（是否剖析在每次执行时按设置判断），
+    BB3D_PROFILE / set_profiling() 中用类名（如 imaaaa、LoadMesh）指定节点
+    """
+    for cls in node_class_mappings.values():
+        method = getattr(cls, cls.FUNCTION, None)
+        if method is None or getattr(method, '__wrapped__', None) is not None:
+            continue
+        setattr(cls, cls.FUNCTION, profiled(cls.__name__, method))
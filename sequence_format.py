@@ -0,0 +1,13 @@
+"""
+序列截图上传格式的常量（不依赖任何其它模块，节点的 INPUT_TYPES 可以直接导入而不会加载查看器服务器）
+
+头部 6 个 uint32（小端）magic / version / format / 帧数 / 宽 / 高，
+之后每帧为 uint32 帧序号 + uint32 字节数 + 数据；format 0 为原始 RGBA，1 为编码图像（WebP，浏览器不支持时为 PNG）
+"""
+
+SEQUENCE_MAGIC = 0x51534242  # b"BBSQ"
+SEQUENCE_VERSION = 1
+SEQUENCE_FORMATS = {'raw': 0, 'webp': 1}
+# 单次序列截图允许的最大帧数与单帧像素数
+SEQUENCE_MAX_FRAMES = 3600
+SEQUENCE_MAX_PIXELS = 8192 * 8192
@@ -0,0 +1,47 @@
+"""
+pytest 公共夹具：按 ComfyUI 的方式把插件目录作为包导入（插件模块之间使用相对导入）
+
+用法: python -m pytest tests
+"""
+
+import importlib
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+PLUGIN_DIR = Path(__file__).resolve().parent.parent
+PACKAGE_NAME = "ComfyUI_3DViewer"
+
+
+def _load_plugin():
+    if PACKAGE_NAME in sys.modules:
+        return sys.modules[PACKAGE_NAME]
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE_NAME, PLUGIN_DIR / "__init__.py", submodule_search_locations=[str(PLUGIN_DIR)]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE_NAME] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session")
+def plugin():
+    return _load_plugin()
+
+
+@pytest.fixture(scope="session")
+def viewer_server(plugin):
+    return importlib.import_module(f"{PACKAGE_NAME}.viewer_server")
+
+
+@pytest.fixture(scope="session")
+def image_io(plugin):
+    return importlib.import_module(f"{PACKAGE_NAME}.image_io")
+
+
+@pytest.fixture(scope="session")
+def mesh_io(plugin):
+    return importlib.import_module(f"{PACKAGE_NAME}.mesh_io")
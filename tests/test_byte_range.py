@@ -0,0 +1,35 @@
+import pytest
+
+
+@pytest.mark.parametrize("header, size, expected", [
+    # 没有 Range 或无法识别时返回完整文件
+    (None, 100, None),
+    ("", 100, None),
+    ("items=0-9", 100, None),
+    ("bytes=a-b", 100, None),
+    # 普通范围
+    ("bytes=0-9", 100, (0, 9)),
+    ("bytes=10-10", 100, (10, 10)),
+    # 后缀范围：最后 N 个字节，超过文件大小时取整个文件
+    ("bytes=-10", 100, (90, 99)),
+    ("bytes=-200", 100, (0, 99)),
+    ("bytes=-0", 100, False),
+    # 开放范围：到文件末尾
+    ("bytes=90-", 100, (90, 99)),
+    ("bytes=0-", 100, (0, 99)),
+    # 越过文件末尾：起点越界为 416，终点越界截断到末尾
+    ("bytes=100-", 100, False),
+    ("bytes=150-160", 100, False),
+    ("bytes=50-500", 100, (50, 99)),
+    # last < first 属于无效范围，忽略后返回完整文件
+    ("bytes=9-5", 100, None),
+    ("bytes=150-5", 100, None),
+    # 空文件上没有可满足的范围
+    ("bytes=0-", 0, False),
+    ("bytes=-5", 0, False),
+    # 多段范围直接返回完整内容
+    ("bytes=0-1,5-6", 100, None),
+    ("bytes=0-1, -5", 100, None),
+])
+def test_parse_byte_range(viewer_server, header, size, expected):
+    assert viewer_server._parse_byte_range(header, size) == expected
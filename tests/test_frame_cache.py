@@ -0,0 +1,36 @@
+"""
+解码帧缓存：同一文件以不同方式解码的结果不能互相命中
+"""
+
+import numpy as np
+import pytest
+
+from PIL import Image
+
+
+@pytest.fixture
+def large_jpeg(tmp_path):
+    # 平滑渐变加噪声：缩小解码（draft + reduce）与逐像素缩放的结果会有可见差异
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:768, 0:1024]
+    base = np.stack([x % 256, y % 256, (x + y) % 256], axis=-1).astype(np.int16)
+    pixels = np.clip(base + rng.integers(-40, 40, base.shape), 0, 255).astype(np.uint8)
+    path = tmp_path / "large.jpg"
+    Image.fromarray(pixels).save(path, quality=90)
+    return str(path)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "uint8"])
+def test_reduce_flag_is_part_of_cache_key(image_io, tmp_path, large_jpeg, dtype):
+    size = (128, 96)
+    plain, _ = image_io._decode_image_batch([large_jpeg], 1, None, size, dtype)
+    reduced, _ = image_io._decode_image_batch([large_jpeg], 1, None, size, dtype, reduce=True)
+    assert not np.array_equal(plain, reduced)
+
+    cache = image_io._FrameCache(tmp_path / "frames", 1 << 30)
+    for reduce, expected in [(False, plain), (True, reduced), (False, plain), (True, reduced)]:
+        images, _ = image_io._decode_image_batch([large_jpeg], 1, cache, size, dtype, reduce=reduce)
+        assert images.shape == expected.shape
+        np.testing.assert_array_equal(images, expected)
+    # 两种解码方式各占一个条目
+    assert len(cache._entries) == 2
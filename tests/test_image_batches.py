@@ -0,0 +1,40 @@
+"""
+分块读取：各块沿批次维度拼接后与 imaaaa 节点一次性读取的 IMAGE / MASK 一致
+"""
+
+import numpy as np
+import pytest
+
+from PIL import Image
+
+
+def _write_frames(directory, modes):
+    rng = np.random.default_rng(len(modes))
+    for k, mode in enumerate(modes):
+        channels = 4 if mode == "RGBA" else 3
+        pixels = rng.integers(0, 256, size=(24, 32, channels), dtype=np.uint8)
+        Image.fromarray(pixels, mode).save(directory / f"frame_{k:03d}.png")
+
+
+def _numpy(output):
+    # 没有 torch 时 IMAGE 为包装器、MASK 为 numpy 数组；有 torch 时两者都是 tensor
+    if hasattr(output, "float32"):
+        return output.float32()
+    return output.numpy() if hasattr(output, "numpy") else np.asarray(output)
+
+
+@pytest.mark.parametrize("modes", [
+    # 带 alpha 的帧只在中间一块：前后两块没有 alpha，遮罩也必须是 [k,H,W]
+    ["RGB", "RGB", "RGB", "RGBA", "RGB", "RGB", "RGB"],
+    ["RGBA", "RGB", "RGB", "RGB", "RGB"],
+    # 全部没有 alpha：与节点一样每块都是 [k,64,64]
+    ["RGB"] * 5,
+])
+def test_stream_matches_load_images(plugin, image_io, tmp_path, modes):
+    _write_frames(tmp_path, modes)
+    images, masks = plugin.imaaaa().load_images(str(tmp_path), decode_workers=1)
+    chunks = list(image_io.iter_image_batches(str(tmp_path), 3, decode_workers=1))
+
+    assert {_numpy(m).shape[1:] for _, m in chunks} == {_numpy(masks).shape[1:]}
+    np.testing.assert_array_equal(np.concatenate([_numpy(i) for i, _ in chunks]), _numpy(images))
+    np.testing.assert_array_equal(np.concatenate([_numpy(m) for _, m in chunks]), _numpy(masks))
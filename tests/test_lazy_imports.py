@@ -0,0 +1,28 @@
+"""
+注册节点与生成节点界面（INPUT_TYPES）时不应加载较重的子模块
+"""
+
+import subprocess
+import sys
+
+from conftest import PACKAGE_NAME, PLUGIN_DIR
+
+CHILD = r"""
+import importlib.util, sys
+spec = importlib.util.spec_from_file_location(
+    {name!r}, {init!r}, submodule_search_locations=[{root!r}]
+)
+plugin = importlib.util.module_from_spec(spec)
+sys.modules[{name!r}] = plugin
+spec.loader.exec_module(plugin)
+for node in plugin.NODE_CLASS_MAPPINGS.values():
+    node.INPUT_TYPES()
+print(",".join(sorted(m.rsplit(".", 1)[-1] for m in sys.modules if m.startswith({name!r} + "."))))
+"""
+
+
+def test_input_types_do_not_import_heavy_modules():
+    code = CHILD.format(name=PACKAGE_NAME, init=str(PLUGIN_DIR / "__init__.py"), root=str(PLUGIN_DIR))
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    loaded = set(proc.stdout.strip().splitlines()[-1].split(","))
+    assert not loaded & {"viewer_server", "image_io", "mesh_io", "mesh_optimize", "mesh_render"}
@@ -0,0 +1,49 @@
+"""
+OBJ 读取：混合三角形 / 四边形 / 多边形时三角形顺序与文件中面的顺序一致
+"""
+
+import numpy as np
+import pytest
+
+
+OBJ = """\
+v 0 0 0
+v 1 0 0
+v 1 1 0
+v 0 1 0
+v 0.5 1.5 0
+v 0 0 1
+f 1 2 3 4
+f 1 2 3
+f 1/1 2/2 3/3 4/4 5/5
+  f 2 3 6  # 缩进与行尾注释
+f -6 -5 -4 -3
+f 4 5
+f 6 5 4
+"""
+
+EXPECTED = [
+    # 四边形 1 2 3 4
+    [0, 1, 2], [0, 2, 3],
+    # 三角形
+    [0, 1, 2],
+    # 五边形（扇形三角化）
+    [0, 1, 2], [0, 2, 3], [0, 3, 4],
+    [1, 2, 5],
+    # 负数索引：相对已读的 6 个顶点
+    [0, 1, 2], [0, 2, 3],
+    # 只有两个顶点的面被忽略
+    [5, 4, 3],
+]
+
+
+@pytest.mark.parametrize("chunk_size", [None, 16])
+def test_mixed_polygons_keep_source_order(mesh_io, tmp_path, monkeypatch, chunk_size):
+    if chunk_size is not None:
+        # 小块读取时面跨越多个块，每块内部与块之间都要保持顺序
+        monkeypatch.setattr(mesh_io._iter_line_chunks, "__defaults__", (chunk_size,))
+    path = tmp_path / "mixed.obj"
+    path.write_text(OBJ)
+    positions, faces = mesh_io._read_obj(str(path))
+    assert positions.shape == (6, 3)
+    np.testing.assert_array_equal(faces, np.array(EXPECTED, dtype=np.int32))
@@ -0,0 +1,58 @@
+"""
+/upload_screenshot：空请求体不能覆盖手动保存的截图，也不能作为截图结果交给等待中的节点
+"""
+
+import functools
+import http.client
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def server(viewer_server, tmp_path):
+    handler = functools.partial(viewer_server.QuietHTTPRequestHandler, directory=str(tmp_path))
+    httpd = viewer_server._PooledHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _post(server, path, body, content_type="image/png"):
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    try:
+        conn.request("POST", path, body=body, headers={"Content-Type": content_type})
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def _snapshot(path):
+    return path.stat().st_mtime_ns if path.exists() else None
+
+
+@pytest.mark.parametrize("content_type", ["image/png", "image/webp", "application/json"])
+def test_empty_manual_upload_rejected(viewer_server, server, content_type):
+    targets = [viewer_server.PLUGIN_DIR / name for name in ("image.png", "image.webp")]
+    before = [_snapshot(t) for t in targets]
+    status, _ = _post(server, "/upload_screenshot", b"", content_type)
+    assert status == 400
+    assert [_snapshot(t) for t in targets] == before
+
+
+def test_empty_upload_for_waiting_node_rejected(viewer_server, server):
+    store = viewer_server._screenshot_store
+    store.expect("empty-upload")
+    try:
+        status, _ = _post(server, "/upload_screenshot?token=empty-upload", b"")
+        assert status == 400
+        assert store.get("empty-upload") is None
+        # 之后的正常上传仍然送达
+        status, _ = _post(server, "/upload_screenshot?token=empty-upload", b"\x89PNG")
+        assert status == 200
+        assert store.get("empty-upload") == b"\x89PNG"
+    finally:
+        store.discard("empty-upload")
@@ -0,0 +1,105 @@
+import io
+import struct
+
+import numpy as np
+import pytest
+
+
+def _reader(data):
+    stream = io.BytesIO(data)
+
+    def read_into(view):
+        if stream.readinto(view) != len(view):
+            raise ConnectionError("请求体不完整")
+    return read_into
+
+
+def _payload(viewer_server, frames, width, height, magic=None, version=1, fmt=0, count=None, indices=None):
+    parts = [struct.pack('<6I', viewer_server.SEQUENCE_MAGIC if magic is None else magic, version, fmt,
+                         len(frames) if count is None else count, width, height)]
+    for k, frame in enumerate(frames):
+        data = frame.tobytes()
+        parts.append(struct.pack('<II', k if indices is None else indices[k], len(data)) + data)
+    return b''.join(parts)
+
+
+def _frames(count, width, height):
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, size=(height, width, 4), dtype=np.uint8) for _ in range(count)]
+
+
+def _receive(viewer_server, data, expected=2, length=None):
+    store = viewer_server._SequenceStore()
+    store.expect("t", expected)
+    store.receive("t", _reader(data), len(data) if length is None else length)
+    return store
+
+
+def test_raw_sequence_round_trip(viewer_server):
+    frames = _frames(2, 4, 3)
+    entry = _receive(viewer_server, _payload(viewer_server, frames, 4, 3)).wait("t", 1)
+    assert entry['batch'].shape == (2, 3, 4, 3)
+    np.testing.assert_allclose(entry['batch'][1], frames[1][..., :3] / 255.0, rtol=1e-6)
+
+
+def test_frames_may_arrive_out_of_order(viewer_server):
+    frames = _frames(2, 4, 3)
+    data = _payload(viewer_server, frames[::-1], 4, 3, indices=[1, 0])
+    entry = _receive(viewer_server, data).wait("t", 1)
+    np.testing.assert_allclose(entry['batch'][0], frames[0][..., :3] / 255.0, rtol=1e-6)
+
+
+@pytest.mark.parametrize("overrides", [
+    {"magic": 0x12345678},
+    {"version": 2},
+    {"fmt": 7},
+    # 帧数超过节点登记的数量 / 为 0
+    {"count": 3},
+    {"count": 0},
+])
+def test_bad_header_rejected(viewer_server, overrides):
+    data = _payload(viewer_server, _frames(2, 4, 3), 4, 3, **overrides)
+    store = viewer_server._SequenceStore()
+    store.expect("t", 2)
+    with pytest.raises(ValueError):
+        store.receive("t", _reader(data), len(data))
+    # 等待中的节点立即得到错误，而不是等到超时
+    with pytest.raises(RuntimeError):
+        store.wait("t", 0)
+
+
+@pytest.mark.parametrize("width, height", [(0, 3), (4, 0), (8193, 8192)])
+def test_bad_frame_size_rejected(viewer_server, width, height):
+    data = struct.pack('<6I', viewer_server.SEQUENCE_MAGIC, 1, 0, 1, width, height)
+    store = viewer_server._SequenceStore()
+    store.expect("t", 1)
+    with pytest.raises(ValueError):
+        store.receive("t", _reader(data), len(data))
+
+
+def test_frame_index_out_of_range_rejected(viewer_server):
+    data = _payload(viewer_server, _frames(2, 4, 3), 4, 3, indices=[0, 2])
+    with pytest.raises(ValueError):
+        _receive(viewer_server, data)
+
+
+def test_duplicate_frame_rejected(viewer_server):
+    data = _payload(viewer_server, _frames(2, 4, 3), 4, 3, indices=[0, 0])
+    with pytest.raises(ValueError):
+        _receive(viewer_server, data)
+
+
+def test_raw_frame_size_mismatch_rejected(viewer_server):
+    data = _payload(viewer_server, _frames(2, 4, 3), 5, 3)
+    with pytest.raises(ValueError):
+        _receive(viewer_server, data)
+
+
+def test_truncated_body_rejected(viewer_server):
+    data = _payload(viewer_server, _frames(2, 4, 3), 4, 3)
+    # Content-Length 小于帧数据声明的大小
+    with pytest.raises(ValueError):
+        _receive(viewer_server, data[:-5])
+    # 连接在请求体读完之前断开
+    with pytest.raises(ConnectionError):
+        _receive(viewer_server, data[:-5], length=len(data))
@@ -0,0 +1,110 @@
+import time
+
+
+def _sessions(viewer_server, timeout=10, max_inflight=2):
+    return viewer_server._ViewerSessions(timeout, max_inflight)
+
+
+def _register(sessions, *viewer_ids):
+    # 一次不等待的轮询即登记会话（轮询本身就是心跳）
+    for viewer_id in viewer_ids:
+        assert sessions.poll(viewer_id, wait=0) is None
+
+
+def test_capture_commands_round_robin(viewer_server):
+    sessions = _sessions(viewer_server)
+    _register(sessions, "a", "b", "c")
+    for k in range(3):
+        sessions.submit({"token": f"t{k}"})
+    taken = {viewer_id: sessions.poll(viewer_id, wait=0)["token"] for viewer_id in ("a", "b", "c")}
+    assert taken == {"a": "t0", "b": "t1", "c": "t2"}
+    # 下一轮从上次分派之后的会话继续
+    sessions.submit({"token": "t3"})
+    assert sessions.poll("a", wait=0)["token"] == "t3"
+
+
+def test_inflight_limit_and_complete(viewer_server):
+    sessions = _sessions(viewer_server, max_inflight=1)
+    _register(sessions, "a")
+    sessions.submit({"token": "t0"})
+    sessions.submit({"token": "t1"})
+    assert sessions.poll("a", wait=0)["token"] == "t0"
+    # 进行中的截图未上传前不再分派
+    assert sessions.poll("a", wait=0) is None
+    assert sessions.snapshot()["unassigned"] == 1
+    sessions.complete("t0")
+    assert sessions.poll("a", wait=0)["token"] == "t1"
+
+
+def test_broadcast_reaches_every_session(viewer_server):
+    sessions = _sessions(viewer_server)
+    _register(sessions, "a", "b")
+    sessions.submit({"model": "/models/x.glb"}, broadcast=True)
+    assert sessions.poll("a", wait=0) == {"model": "/models/x.glb"}
+    assert sessions.poll("b", wait=0) == {"model": "/models/x.glb"}
+
+
+def test_expired_session_requeues_queued_and_inflight(viewer_server):
+    sessions = _sessions(viewer_server, timeout=0.05)
+    _register(sessions, "a", "b")
+    sessions.submit({"token": "inflight"})
+    sessions.submit({"token": "queued"})
+    # a 取走第一条后不再轮询；第二条分派给 b，但 b 也一直没有来取
+    assert sessions.poll("a", wait=0)["token"] == "inflight"
+    time.sleep(0.1)
+    # c 上线后 a、b 都已超时：a 进行中与 b 排队中的截图命令都重新分派给 c
+    tokens = {sessions.poll("c", wait=0)["token"], sessions.poll("c", wait=0)["token"]}
+    assert [s["viewer"] for s in sessions.snapshot()["sessions"]] == ["c"]
+    assert tokens == {"inflight", "queued"}
+
+
+def test_cancel_removes_pending_commands(viewer_server):
+    sessions = _sessions(viewer_server)
+    sessions.submit({"token": "t0"})
+    sessions.cancel(["t0"])
+    _register(sessions, "a")
+    assert sessions.poll("a", wait=0) is None
+    assert sessions.snapshot()["unassigned"] == 0
+
+
+def test_long_poll_wakes_on_submit(viewer_server):
+    import threading
+
+    sessions = _sessions(viewer_server)
+    _register(sessions, "a")
+    timer = threading.Timer(0.05, sessions.submit, args=({"token": "late"},))
+    timer.start()
+    try:
+        start = time.monotonic()
+        command = sessions.poll("a", wait=5)
+    finally:
+        timer.cancel()
+    assert command["token"] == "late"
+    assert time.monotonic() - start < 2
+
+
+def test_inflight_sequence_not_requeued_before_deadline(viewer_server):
+    sessions = _sessions(viewer_server, timeout=0.05)
+    _register(sessions, "a")
+    sessions.submit({"token": "seq", "sequence": [{}]}, deadline=time.monotonic() + 0.3)
+    assert sessions.poll("a", wait=0)["token"] == "seq"
+    # a 渲染与上传序列期间不轮询：超过心跳超时，但未到截止时间，命令不会交给 b
+    time.sleep(0.1)
+    assert sessions.poll("b", wait=0) is None
+    assert {s["viewer"] for s in sessions.snapshot()["sessions"]} == {"a", "b"}
+    # 截止时间过后 a 才按普通会话过期，命令重新分派
+    time.sleep(0.25)
+    assert sessions.poll("b", wait=0)["token"] == "seq"
+
+
+def test_heartbeat_keeps_busy_session_alive(viewer_server):
+    sessions = _sessions(viewer_server, timeout=0.1)
+    _register(sessions, "a")
+    sessions.submit({"token": "t0"})
+    assert sessions.poll("a", wait=0)["token"] == "t0"
+    for _ in range(4):
+        time.sleep(0.05)
+        sessions.touch("a")
+    assert sessions.poll("b", wait=0) is None
+    sessions.complete("t0")
+    assert [s["inflight"] for s in sessions.snapshot()["sessions"] if s["viewer"] == "a"] == [0]
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+下载 ve2.html 依赖的 three.js 等脚本到 vendor/ 目录，并生成 gzip/brotli 预压缩文件
+
+用法: python vendor_assets.py [--force]
+下载列表见 vendor/manifest.json（本地路径 -> CDN 地址）。
+查看器默认从 CDN 加载这些脚本，CDN 不可用（离线）时回退到 vendor/ 中的本地副本，因此本脚本是可选的。
+brotli 预压缩需要安装可选的 brotli 包，未安装时只生成 .gz。
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import urllib.request
+from pathlib import Path
+
+PLUGIN_DIR = Path(__file__).parent
+VENDOR_DIR = PLUGIN_DIR / "vendor"
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def precompress(path):
+    """为 path 生成 .gz（以及可用时的 .br）预压缩文件"""
+    data = path.read_bytes()
+    with open(str(path) + ".gz", "wb") as f:
+        # mtime=0 保证相同内容生成相同的压缩文件
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(str(path) + ".br", "wb") as f:
+            f.write(brotli.compress(data, quality=11))
+
+
+def download(url, target):
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + ".part")
+    with urllib.request.urlopen(url, timeout=60) as resp, open(tmp, "wb") as f:
+        while True:
+            chunk = resp.read(1024 * 1024)
+            if not chunk:
+                break
+            f.write(chunk)
+    os.replace(tmp, target)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", action="store_true", help="重新下载已存在的文件")
+    args = parser.parse_args()
+
+    manifest = json.loads((VENDOR_DIR / "manifest.json").read_text(encoding="utf-8"))
+    failed = 0
+    for rel, url in manifest.items():
+        target = VENDOR_DIR / rel
+        if target.exists() and not args.force:
+            print(f"✅ 已存在: {rel}")
+        else:
+            try:
+                download(url, target)
+                print(f"✅ 已下载: {rel}")
+            except Exception as e:
+                print(f"❌ 下载失败: {rel} ({e})")
+                failed += 1
+                continue
+        precompress(target)
+
+    # 查看器页面本身也生成预压缩文件（修改 ve2.html 后重新运行即可，过期的压缩文件会被服务器忽略）
+    precompress(PLUGIN_DIR / "ve2.html")
+    print(f"\n完成：{len(manifest) - failed}/{len(manifest)} 个脚本可离线使用")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1436 @@
+"""
+查看器 HTTP 服务器：静态资源、/next_command 命令长轮询、截图与序列上传、/models 模型文件与 /metrics 指标，
+以及截图存储、查看器会话注册表和按端口复用的服务器注册表
+
+插件包只在节点需要时（打开查看器、截图、推送网格）才导入本模块，不增加 ComfyUI 的启动时间
+"""
+
+import atexit
+import base64
+import functools
+import gzip
+import hashlib
+import http.server
+import io
+import json
+import os
+import selectors
+import socket
+import struct
+import tempfile
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    from PIL import Image
+    import numpy as np
+except Exception:
+    Image = None
+    np = None
+
+from .metrics import REGISTRY as _metrics
+from .sequence_format import (
+    SEQUENCE_FORMATS, SEQUENCE_MAGIC, SEQUENCE_MAX_FRAMES, SEQUENCE_MAX_PIXELS, SEQUENCE_VERSION,
+)
+
+PLUGIN_DIR = Path(__file__).parent
+
+_metrics.describe('bb3d_http_requests_total', '查看器服务器请求数（按方法、接口与状态码）')
+_metrics.describe('bb3d_http_request_duration_seconds', '查看器服务器请求耗时')
+_metrics.describe('bb3d_http_upload_bytes_total', '上传请求的请求体字节数')
+_metrics.describe('bb3d_viewer_command_wait_seconds', '截图命令从提交到被查看器取走的等待时间')
+_metrics.describe('bb3d_screenshot_wait_seconds', '截图从登记等待到上传完成的时间')
+
+
+class _ScreenshotStore:
+    """
+    按 token 隔离的截图内存存储：等待中的截图节点通过 expect()/wait() 领取上传结果。
+    已上传的结果按 TTL 过期、超过字节预算时按 LRU 淘汰；设置 spill_dir 时被淘汰的结果
+    先落盘而不是直接丢弃（快速路径始终只在内存中完成，不访问文件系统）
+    """
+
+    def __init__(self, max_bytes, ttl, spill_dir=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self._lock = threading.Lock()
+        # token -> {'event', 'data', 'path', 'size', 'time'}，按最近使用顺序排列
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def expect(self, token):
+        """登记一个等待中的 token（上传到达时唤醒 wait）"""
+        with self._lock:
+            self._entries[token] = {'event': threading.Event(), 'data': None, 'path': None, 'size': 0, 'time': time.monotonic()}
+
+    def is_expected(self, token):
+        with self._lock:
+            return token in self._entries
+
+    def put(self, token, data):
+        """保存上传结果；未登记的 token 返回 False（由调用方按手动保存处理）"""
+        spills = []
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return False
+            if entry['data'] is None and not entry['path']:
+                _metrics.observe('bb3d_screenshot_wait_seconds', time.monotonic() - entry['time'])
+            self._bytes -= entry['size'] if entry['data'] is not None else 0
+            entry['data'] = data
+            entry['size'] = len(data)
+            entry['time'] = time.monotonic()
+            self._bytes += entry['size']
+            self._entries.move_to_end(token)
+            entry['event'].set()
+            spills = self._evict_locked()
+        self._spill(spills)
+        return True
+
+    def wait(self, token, timeout):
+        """等待 token 的上传结果，超时返回 None"""
+        with self._lock:
+            entry = self._entries.get(token)
+        if entry is None or not entry['event'].wait(timeout):
+            return None
+        return self.get(token)
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            self._entries.move_to_end(token)
+            data = entry['data']
+            path = entry['path']
+        if data is None and path:
+            try:
+                with open(path, 'rb') as f:
+                    return f.read()
+            except OSError:
+                return None
+        return data
+
+    def stats(self):
+        """等待中 / 已上传的条目数与内存占用字节数"""
+        with self._lock:
+            ready = sum(1 for e in self._entries.values() if e['data'] is not None or e['path'])
+            return {'pending': len(self._entries) - ready, 'ready': ready, 'bytes': self._bytes}
+
+    def discard(self, token):
+        with self._lock:
+            entry = self._entries.pop(token, None)
+            if entry and entry['data'] is not None:
+                self._bytes -= entry['size']
+        if entry and entry['path']:
+            self._unlink(entry['path'])
+
+    def _evict_locked(self):
+        """移除过期条目，并在超过字节预算时按 LRU 淘汰；返回需要落盘的 (token, data)"""
+        now = time.monotonic()
+        # 只让已上传的结果过期，仍在等待上传的 token 由调用方自行 discard
+        expired = [
+            t for t, e in self._entries.items()
+            if (e['data'] is not None or e['path']) and now - e['time'] > self.ttl
+        ]
+        for token in expired:
+            entry = self._entries.pop(token)
+            if entry['data'] is not None:
+                self._bytes -= entry['size']
+            if entry['path']:
+                self._unlink(entry['path'])
+        spills = []
+        for token, entry in self._entries.items():
+            if self._bytes <= self.max_bytes:
+                break
+            if entry['data'] is None:
+                continue
+            self._bytes -= entry['size']
+            if self.spill_dir is not None:
+                spills.append((token, entry['data']))
+            entry['data'] = None
+        return spills
+
+    def _spill(self, spills):
+        if not spills:
+            return
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        for token, data in spills:
+            path = self.spill_dir / f"{uuid.uuid5(uuid.NAMESPACE_URL, token).hex}.img"
+            try:
+                with open(path, 'wb') as f:
+                    f.write(data)
+            except OSError:
+                continue
+            with self._lock:
+                entry = self._entries.get(token)
+                if entry is not None and entry['data'] is None:
+                    entry['path'] = str(path)
+                    continue
+            self._unlink(str(path))
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+# 截图存储：内存预算、结果保留时间（秒）与淘汰时的落盘目录（设为 None 则直接丢弃）
+SCREENSHOT_STORE_MAX_BYTES = 512 * 1024 * 1024
+SCREENSHOT_STORE_TTL = 600
+SCREENSHOT_SPILL_DIR = PLUGIN_DIR / "cache" / "screenshots"
+_screenshot_store = _ScreenshotStore(SCREENSHOT_STORE_MAX_BYTES, SCREENSHOT_STORE_TTL, SCREENSHOT_SPILL_DIR)
+
+
+class _SequenceStore:
+    """
+    序列截图的接收端：节点用 expect() 登记 token，上传到达后按帧增量解码进预分配的
+    [N,H,W,3] float32 批次（收到头部时分配一次），全部帧到齐后唤醒 wait()
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # token -> {'event', 'batch', 'error', 'frames', 'seconds'}
+        self._entries = {}
+
+    def expect(self, token, count):
+        with self._lock:
+            self._entries[token] = {'event': threading.Event(), 'count': count, 'batch': None,
+                                    'error': None, 'frames': 0, 'seconds': 0.0}
+
+    def is_expected(self, token):
+        with self._lock:
+            return token in self._entries
+
+    def receive(self, token, read_into, length):
+        """
+        从请求体流式读取并解码全部帧
+
+        read_into(view): 把请求体的下一段读满 view（数据不足时抛出 ConnectionError）
+        """
+        with self._lock:
+            entry = self._entries.get(token)
+        if entry is None:
+            raise KeyError(token)
+        start = time.perf_counter()
+        try:
+            header = bytearray(24)
+            read_into(memoryview(header))
+            magic, version, fmt, count, width, height = struct.unpack('<6I', header)
+            if magic != SEQUENCE_MAGIC or version != SEQUENCE_VERSION or fmt not in SEQUENCE_FORMATS.values():
+                raise ValueError("无法识别的序列截图数据")
+            if not 0 < count <= min(entry['count'], SEQUENCE_MAX_FRAMES) or not 0 < width * height <= SEQUENCE_MAX_PIXELS:
+                raise ValueError(f"序列截图尺寸无效: {count} 帧 {width}x{height}")
+            batch = np.empty((count, height, width, 3), dtype=np.float32)
+            received = np.zeros(count, dtype=bool)
+            frame_header = bytearray(8)
+            raw_size = width * height * 4
+            # 原始 RGBA 帧大小固定，复用同一块接收缓冲区
+            payload = bytearray(raw_size) if fmt == SEQUENCE_FORMATS['raw'] else None
+            consumed = 24
+            for _ in range(count):
+                read_into(memoryview(frame_header))
+                index, size = struct.unpack('<II', frame_header)
+                consumed += 8 + size
+                if index >= count or consumed > length:
+                    raise ValueError("序列截图数据损坏")
+                if fmt == SEQUENCE_FORMATS['raw']:
+                    if size != raw_size:
+                        raise ValueError("原始帧大小与头部不一致")
+                    read_into(memoryview(payload))
+                    rgba = np.frombuffer(payload, dtype=np.uint8).reshape(height, width, 4)
+                    np.multiply(rgba[..., :3], 1.0 / 255.0, out=batch[index])
+                else:
+                    data = bytearray(size)
+                    read_into(memoryview(data))
+                    with Image.open(io.BytesIO(data)) as img:
+                        frame = np.asarray(img.convert('RGB'))
+                    if frame.shape[:2] != (height, width):
+                        raise ValueError("编码帧尺寸与头部不一致")
+                    np.multiply(frame, 1.0 / 255.0, out=batch[index])
+                received[index] = True
+            if not received.all():
+                raise ValueError("序列截图帧不完整")
+        except Exception as e:
+            entry['error'] = e
+            entry['event'].set()
+            raise
+        entry['batch'] = batch
+        entry['frames'] = count
+        entry['seconds'] = time.perf_counter() - start
+        entry['event'].set()
+
+    def wait(self, token, timeout):
+        """等待序列接收完成，返回 entry（含 batch / frames / seconds）；超时返回 None，上传出错时抛出异常"""
+        with self._lock:
+            entry = self._entries.get(token)
+        if entry is None or not entry['event'].wait(timeout):
+            return None
+        if entry['error'] is not None:
+            raise RuntimeError(f"序列截图上传失败: {entry['error']}")
+        return entry
+
+    def discard(self, token):
+        with self._lock:
+            self._entries.pop(token, None)
+
+
+_sequence_store = _SequenceStore()
+# 截图上传：流式读取的块大小，以及二进制上传支持的 Content-Type -> 保存的扩展名
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+_BINARY_UPLOAD_TYPES = {
+    'image/png': '.png',
+    'application/octet-stream': '.png',
+    'image/webp': '.webp',
+}
+# /next_command?wait= 允许的最长等待时间（秒）
+NEXT_COMMAND_MAX_WAIT = 30
+# 查看器会话的心跳超时（秒）：最近一次轮询结束后超过该时间未再轮询即视为已关闭
+VIEWER_SESSION_TIMEOUT = 10
+# 每个会话同时进行中的截图数上限（2 可让上一张上传时开始渲染下一张）
+VIEWER_SESSION_MAX_INFLIGHT = 2
+
+
+class _ViewerSessions:
+    """
+    查看器会话注册表：每个查看器页面以自己的 viewer id 长轮询 /next_command，轮询本身即心跳。
+    截图命令按轮转顺序分派给负载最低的空闲会话（各会话有独立队列），多个页面可以并行截图；
+    加载模型等命令广播给所有在线会话，保证各页面场景一致。会话失去心跳时，
+    其排队中和进行中的截图命令重新分派给其它会话；提交时带 deadline 的命令（序列截图，
+    渲染与上传期间页面不轮询）在截止时间之前不会因心跳超时而被重新分派
+    """
+
+    def __init__(self, timeout, max_inflight):
+        self.timeout = timeout
+        self.max_inflight = max_inflight
+        self._cond = threading.Condition()
+        # viewer id -> {'queue': deque, 'inflight': {token: command}, 'last_seen', 'polling'}
+        self._sessions = OrderedDict()
+        # 暂时没有空闲会话时等待分派的命令
+        self._unassigned = deque()
+        # token -> viewer id（已被取走、尚未上传的截图）
+        self._inflight = {}
+        # token -> 提交时间（用于统计命令排队等待时间）
+        self._submitted = {}
+        # token -> 截止时间（进行中时视为会话仍在线）
+        self._deadlines = {}
+        self._last_assigned = None
+
+    def _session_locked(self, viewer_id):
+        session = self._sessions.get(viewer_id)
+        if session is None:
+            session = {'queue': deque(), 'inflight': {}, 'last_seen': time.monotonic(), 'polling': 0}
+            self._sessions[viewer_id] = session
+        return session
+
+    def _alive(self, session, now):
+        if session['polling'] > 0 or now - session['last_seen'] <= self.timeout:
+            return True
+        return any(self._deadlines.get(token, 0.0) > now for token in session['inflight'])
+
+    def _expire_locked(self, now):
+        for viewer_id in [v for v, s in self._sessions.items() if not self._alive(s, now)]:
+            session = self._sessions.pop(viewer_id)
+            requeue = list(session['inflight'].values()) + [c for c in session['queue'] if c.get('token')]
+            for token in session['inflight']:
+                self._inflight.pop(token, None)
+            self._unassigned.extendleft(reversed(requeue))
+        for token in [t for t, deadline in self._deadlines.items() if deadline <= now]:
+            del self._deadlines[token]
+
+    def _dispatch_locked(self, now):
+        """把待分派的命令交给空闲会话：负载（排队 + 进行中）最低者优先，相同时按轮转顺序"""
+        while self._unassigned:
+            ids = list(self._sessions)
+            if self._last_assigned in self._sessions:
+                k = ids.index(self._last_assigned) + 1
+                ids = ids[k:] + ids[:k]
+            best = None
+            for viewer_id in ids:
+                session = self._sessions[viewer_id]
+                load = len(session['queue']) + len(session['inflight'])
+                if session['queue'] or load >= self.max_inflight or not self._alive(session, now):
+                    continue
+                if best is None or load < best[0]:
+                    best = (load, viewer_id)
+            if best is None:
+                return
+            self._sessions[best[1]]['queue'].append(self._unassigned.popleft())
+            self._last_assigned = best[1]
+
+    def submit(self, command, broadcast=False, deadline=None):
+        """
+        提交命令；deadline（time.monotonic() 时刻）表示节点最多等到何时，
+        命令被取走后到该时刻之前，执行它的会话即使不再轮询也不会过期
+        """
+        with self._cond:
+            now = time.monotonic()
+            if command.get('token'):
+                self._submitted[command['token']] = now
+                if deadline is not None:
+                    self._deadlines[command['token']] = deadline
+            self._expire_locked(now)
+            live = [s for s in self._sessions.values() if self._alive(s, now)] if broadcast else []
+            for session in live:
+                session['queue'].append(dict(command))
+            if not live:
+                self._unassigned.append(command)
+                self._dispatch_locked(now)
+            self._cond.notify_all()
+
+    def poll(self, viewer_id, wait=0.0):
+        """取出该会话的下一条命令；没有时最多等待 wait 秒，超时返回 None"""
+        deadline = time.monotonic() + wait
+        with self._cond:
+            session = self._session_locked(viewer_id)
+            session['polling'] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._expire_locked(now)
+                    self._dispatch_locked(now)
+                    if session['queue']:
+                        command = session['queue'].popleft()
+                        token = command.get('token')
+                        if token:
+                            session['inflight'][token] = command
+                            self._inflight[token] = viewer_id
+                            submitted = self._submitted.pop(token, None)
+                            if submitted is not None:
+                                _metrics.observe('bb3d_viewer_command_wait_seconds', now - submitted)
+                        return command
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        return None
+                    self._cond.wait(remaining)
+            finally:
+                session['polling'] -= 1
+                session['last_seen'] = time.monotonic()
+
+    def touch(self, viewer_id):
+        """心跳：页面忙于长时间的命令（序列截图）而暂停轮询时，刷新会话的在线时间但不取命令"""
+        with self._cond:
+            self._session_locked(viewer_id)['last_seen'] = time.monotonic()
+
+    def complete(self, token):
+        """截图已上传：释放会话的进行中名额，并尝试分派下一条命令"""
+        with self._cond:
+            self._deadlines.pop(token, None)
+            session = self._sessions.get(self._inflight.pop(token, None))
+            if session is not None:
+                session['inflight'].pop(token, None)
+            self._dispatch_locked(time.monotonic())
+            self._cond.notify_all()
+
+    def cancel(self, tokens):
+        """移除这些 token 尚未完成的命令（截图节点超时或出错时）"""
+        tokens = set(tokens)
+        with self._cond:
+            self._unassigned = deque(c for c in self._unassigned if c.get('token') not in tokens)
+            for session in self._sessions.values():
+                session['queue'] = deque(c for c in session['queue'] if c.get('token') not in tokens)
+                for token in tokens & set(session['inflight']):
+                    del session['inflight'][token]
+            for token in tokens:
+                self._inflight.pop(token, None)
+                self._submitted.pop(token, None)
+                self._deadlines.pop(token, None)
+            self._dispatch_locked(time.monotonic())
+
+    def snapshot(self):
+        """当前会话状态，用于诊断"""
+        with self._cond:
+            now = time.monotonic()
+            return {
+                'unassigned': len(self._unassigned),
+                'sessions': [
+                    {
+                        'viewer': viewer_id,
+                        'queued': len(s['queue']),
+                        'inflight': len(s['inflight']),
+                        'polling': s['polling'] > 0,
+                        'idle_seconds': 0.0 if s['polling'] else round(now - s['last_seen'], 3),
+                    }
+                    for viewer_id, s in self._sessions.items() if self._alive(s, now)
+                ],
+            }
+
+
+_viewer_sessions = _ViewerSessions(VIEWER_SESSION_TIMEOUT, VIEWER_SESSION_MAX_INFLIGHT)
+
+
+def _queue_capture_command(token, camera=None):
+    """
+    提交截图命令，由会话注册表分派给空闲的查看器并唤醒其长轮询
+
+    camera: 可选的环绕相机参数 {'azimuth': 度, 'elevation': 度}，查看器截图前会先转到该角度
+    """
+    command = {'token': token}
+    if camera:
+        command['camera'] = camera
+    _viewer_sessions.submit(command)
+
+
+def _queue_model_command(url, name=None):
+    """让所有已打开的查看器按 URL 加载模型（例如由 🔵BB 读取网格 推送的 GLB）"""
+    command = {'model': url}
+    if name:
+        command['name'] = name
+    _viewer_sessions.submit(command, broadcast=True)
+
+
+def get_viewer_sessions():
+    """返回在线查看器会话及其队列状态"""
+    return _viewer_sessions.snapshot()
+
+
+# 查看器服务器绑定的地址：默认只监听本机。服务器会列出并提供 ComfyUI input/output 下的模型文件、
+# 按请求生成 LOD，且没有认证；需要从局域网访问时显式设置 BB3D_VIEWER_HOST（如 0.0.0.0）
+VIEWER_HOST = os.environ.get('BB3D_VIEWER_HOST', '127.0.0.1')
+
+# 查看器 HTTP 服务器：线程池大小（同时处理中的请求数，含 /next_command 长轮询）、
+# 请求读取超时与 keep-alive 连接的空闲超时（秒）。空闲连接由选择器等待，不占用工作线程
+VIEWER_MAX_WORKERS = 32
+VIEWER_REQUEST_TIMEOUT = 15
+VIEWER_KEEPALIVE_TIMEOUT = 15
+
+
+def _record_request(method, endpoint, status, seconds, upload_bytes=0):
+    _metrics.inc('bb3d_http_requests_total', method=method, endpoint=endpoint, code=status)
+    _metrics.observe('bb3d_http_request_duration_seconds', seconds, method=method, endpoint=endpoint)
+    if upload_bytes:
+        _metrics.inc('bb3d_http_upload_bytes_total', upload_bytes, endpoint=endpoint)
+
+
+def _queue_depth_gauge():
+    snapshot = _viewer_sessions.snapshot()
+    return [
+        ({'state': 'unassigned'}, snapshot['unassigned']),
+        ({'state': 'queued'}, sum(s['queued'] for s in snapshot['sessions'])),
+        ({'state': 'inflight'}, sum(s['inflight'] for s in snapshot['sessions'])),
+    ]
+
+
+def _screenshot_store_gauge():
+    stats = _screenshot_store.stats()
+    return [({'state': 'pending'}, stats['pending']), ({'state': 'ready'}, stats['ready'])]
+
+
+_metrics.register_gauge('bb3d_viewer_sessions', '在线查看器会话数',
+                        lambda: [({}, len(_viewer_sessions.snapshot()['sessions']))])
+_metrics.register_gauge('bb3d_viewer_queue_depth', '查看器命令队列深度（待分派 / 会话队列中 / 进行中）', _queue_depth_gauge)
+_metrics.register_gauge('bb3d_screenshot_store_entries', '截图存储中的条目数（等待上传 / 已上传）', _screenshot_store_gauge)
+_metrics.register_gauge('bb3d_screenshot_store_bytes', '截图存储占用的内存字节数',
+                        lambda: [({}, _screenshot_store.stats()['bytes'])])
+_metrics.register_gauge('bb3d_http_idle_connections', '两次请求之间等待中的 keep-alive 连接数（不占用工作线程）',
+                        lambda: [({'port': port}, running['server'].idle_connections())
+                                 for port, running in list(_viewer_servers.items())])
+
+
+def get_endpoint_stats():
+    """
+    返回查看器服务器各接口的延迟统计快照
+
+    Returns:
+        dict: endpoint -> {'count', 'total', 'max', 'mean'}（单位：秒）
+    """
+    series = _metrics.snapshot()['histograms'].get('bb3d_http_request_duration_seconds', {})
+    stats = {}
+    for labels, hist in series.items():
+        fields = dict(part.split('=', 1) for part in labels.split(','))
+        stats[f"{fields['method']} {fields['endpoint']}"] = {
+            'count': hist['count'], 'total': hist['sum'], 'max': hist['max'], 'mean': hist['mean'],
+        }
+    return stats
+
+
+# 静态资源：vendor/ 目录（可选的 three.js 等脚本本地副本，CDN 不可用时查看器回退到这里）与其下载清单
+VENDOR_DIR = PLUGIN_DIR / "vendor"
+# 可以动态 gzip 的内容类型，以及动态压缩的文件大小上限
+_COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+_DYNAMIC_GZIP_MAX_BYTES = 16 * 1024 * 1024
+# 预压缩文件：Accept-Encoding 名称 -> 文件后缀（按优先级排列）
+_PRECOMPRESSED_VARIANTS = (('br', '.br'), ('gzip', '.gz'))
+
+# (path, mtime_ns, size) -> 内容 sha1，用于强 ETag
+_static_etags = {}
+# (path, mtime_ns, size) -> gzip 后的字节（动态压缩结果，LRU）
+_static_gzip_cache = OrderedDict()
+_STATIC_GZIP_CACHE_ENTRIES = 32
+_static_cache_lock = threading.Lock()
+_vendor_manifest = None
+
+
+def _load_vendor_manifest():
+    """vendor/manifest.json：本地相对路径 -> CDN 地址（读取失败时为空）"""
+    global _vendor_manifest
+    if _vendor_manifest is None:
+        try:
+            _vendor_manifest = json.loads((VENDOR_DIR / "manifest.json").read_text(encoding='utf-8'))
+        except Exception:
+            _vendor_manifest = {}
+    return _vendor_manifest
+
+
+def missing_vendor_assets():
+    """manifest 中尚未下载到 vendor/ 的脚本（相对路径列表）；非空时查看器离线（CDN 不可用）时无法加载"""
+    return [rel for rel in _load_vendor_manifest() if not (VENDOR_DIR / rel).is_file()]
+
+
+def _is_versioned_vendor_path(url_path):
+    """/vendor/<包名>@<版本>/... 形式的路径：内容随版本号固定，可以长期缓存"""
+    if not url_path.startswith('/vendor/'):
+        return False
+    package = url_path[len('/vendor/'):].split('/', 1)[0]
+    return '@' in package
+
+
+def _static_etag(path, st):
+    key = (path, st.st_mtime_ns, st.st_size)
+    with _static_cache_lock:
+        etag = _static_etags.get(key)
+    if etag is None:
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        etag = digest.hexdigest()[:20]
+        with _static_cache_lock:
+            _static_etags[key] = etag
+    return etag
+
+
+def _static_gzip(path, st):
+    key = (path, st.st_mtime_ns, st.st_size)
+    with _static_cache_lock:
+        data = _static_gzip_cache.get(key)
+        if data is not None:
+            _static_gzip_cache.move_to_end(key)
+            return data
+    with open(path, 'rb') as f:
+        data = gzip.compress(f.read(), compresslevel=6, mtime=0)
+    with _static_cache_lock:
+        _static_gzip_cache[key] = data
+        while len(_static_gzip_cache) > _STATIC_GZIP_CACHE_ENTRIES:
+            _static_gzip_cache.popitem(last=False)
+    return data
+
+
+# 模型文件接口：GET /models 列出可加载的模型，GET /models/<root>/<相对路径> 提供文件（支持 Range）
+MODEL_EXTENSIONS = ('.glb', '.gltf', '.fbx', '.obj', '.ply', '.stl', '.dae')
+# 模型引用的附属文件（glTF 的 .bin/贴图、OBJ 的 .mtl 等）也允许按相对路径访问
+MODEL_ASSET_EXTENSIONS = MODEL_EXTENSIONS + ('.bin', '.mtl', '.png', '.jpg', '.jpeg', '.webp', '.tga', '.ktx2')
+# 可通过 ?lod= 请求服务器端预处理（焊接、减面、量化为 GLB）的网格格式
+MESH_LOD_EXTENSIONS = ('.obj', '.stl', '.ply')
+# /models 列表最多返回的条目数
+MODEL_LIST_LIMIT = 5000
+# 通过节点 model_path 单独登记的模型文件（不在已配置目录中时）：id -> 绝对路径
+_model_files = {}
+_model_files_lock = threading.Lock()
+
+
+def _model_roots():
+    """可通过 /models 访问的目录：ComfyUI 的 output/input 目录（可用时）与插件目录"""
+    roots = {}
+    try:
+        import folder_paths
+        roots['output'] = folder_paths.get_output_directory()
+        roots['input'] = folder_paths.get_input_directory()
+    except Exception:
+        pass
+    roots['plugin'] = str(PLUGIN_DIR)
+    return {name: os.path.realpath(path) for name, path in roots.items()}
+
+
+def _model_url(path):
+    """返回查看器加载 path 所用的 URL；不在已配置目录中的文件会被单独登记"""
+    full = os.path.realpath(path)
+    for name, root in _model_roots().items():
+        if os.path.commonpath([root, full]) == root:
+            rel = os.path.relpath(full, root).replace(os.sep, '/')
+            return f"/models/{name}/{urllib.parse.quote(rel)}"
+    file_id = hashlib.sha1(full.encode('utf-8', errors='surrogateescape')).hexdigest()[:16]
+    with _model_files_lock:
+        _model_files[file_id] = full
+    return f"/models/_/{file_id}/{urllib.parse.quote(os.path.basename(full))}"
+
+
+def _resolve_model_path(url_path):
+    """把 /models/... 请求路径解析为磁盘路径；越界或不允许的文件返回 None"""
+    parts = url_path[len('/models/'):].split('/', 1)
+    if len(parts) != 2:
+        return None
+    root_name, rel = parts[0], urllib.parse.unquote(parts[1])
+    if root_name == '_':
+        with _model_files_lock:
+            return _model_files.get(rel.split('/', 1)[0])
+    root = _model_roots().get(root_name)
+    if not root:
+        return None
+    full = os.path.realpath(os.path.join(root, rel))
+    if os.path.commonpath([root, full]) != root or not full.lower().endswith(MODEL_ASSET_EXTENSIONS):
+        return None
+    return full
+
+
+def _list_models(root_filter=None):
+    models = []
+    for name, root in _model_roots().items():
+        if root_filter and name != root_filter:
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.') and d != '__pycache__']
+            for filename in filenames:
+                if not filename.lower().endswith(MODEL_EXTENSIONS):
+                    continue
+                full = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                rel = os.path.relpath(full, root).replace(os.sep, '/')
+                models.append({
+                    'root': name,
+                    'path': rel,
+                    'size': st.st_size,
+                    'mtime': st.st_mtime,
+                    'url': f"/models/{name}/{urllib.parse.quote(rel)}",
+                })
+                if len(models) >= MODEL_LIST_LIMIT:
+                    return models
+    return models
+
+
+def _parse_byte_range(header, size):
+    """
+    解析单段 Range 头
+
+    Returns:
+        None: 没有（或忽略）Range，返回完整文件
+        False: 范围无法满足（416）
+        (start, end): 闭区间
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        # 多段范围按规范可以直接返回完整内容
+        return None
+    start_s, _, end_s = header[len('bytes='):].strip().partition('-')
+    try:
+        if not start_s:
+            suffix = int(end_s)
+            if suffix <= 0:
+                return False
+            return (max(0, size - suffix), size - 1) if size else False
+        start = int(start_s)
+        end = int(end_s) if end_s else size - 1
+    except ValueError:
+        return None
+    if end_s and end < start:
+        # 语法无效的范围（last < first）按规范忽略，返回完整文件
+        return None
+    if start >= size:
+        return False
+    return start, min(end, size - 1)
+
+
+class QuietHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """
+    查看器请求处理器：静态文件（ETag/压缩/缓存）+ /next_command 轮询 + /upload_screenshot 截图上传
+    + /models 模型文件（Range）+ /metrics 运行指标（Prometheus 文本格式）。
+    使用 HTTP/1.1 keep-alive，所有响应都必须带 Content-Length。
+    """
+    protocol_version = 'HTTP/1.1'
+    # 响应头与正文分两次写出：关闭 Nagle，避免与客户端的延迟 ACK 叠加出约 40ms 的停顿
+    disable_nagle_algorithm = True
+    # 读取单个请求（请求行、头部与请求体）的套接字超时
+    timeout = VIEWER_REQUEST_TIMEOUT
+    # API 接口按路径统计，其余请求（静态文件）归为一类，避免统计项无限增长
+    API_ENDPOINTS = ('/next_command', '/upload_screenshot', '/upload_sequence', '/models', '/metrics')
+
+    def log_message(self, format, *args):
+        pass  # 静默日志
+
+    def parse_request(self):
+        self._request_start = time.perf_counter()
+        return super().parse_request()
+
+    def send_response_only(self, code, message=None):
+        self._status_code = code
+        super().send_response_only(code, message)
+
+    def handle(self):
+        """
+        只处理已经到达的请求：keep-alive 连接上没有待处理的数据时交还服务器的空闲连接选择器，
+        工作线程立即回到线程池，下一个请求到达时再分派给任意工作线程
+        """
+        self.parked = False
+        self.close_connection = True
+        self.handle_one_request()
+        park = getattr(self.server, 'park_connection', None)
+        while not self.close_connection:
+            if park is not None and not self._request_pending():
+                # 先把已缓冲的响应写出，再把连接交出去
+                self.wfile.flush()
+                self.parked = True
+                park(self.connection, self.client_address)
+                return
+            self.handle_one_request()
+
+    def _request_pending(self):
+        """rfile 缓冲区或套接字中是否已有下一个请求的数据（不阻塞）"""
+        self.connection.setblocking(False)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def handle_one_request(self):
+        self._request_start = None
+        self._status_code = None
+        super().handle_one_request()
+        if self._request_start is not None and self.command:
+            path = urllib.parse.urlparse(self.path).path
+            if path.startswith('/models/'):
+                endpoint = '/models/*'
+            else:
+                endpoint = path if path in self.API_ENDPOINTS else 'static'
+            upload_bytes = 0
+            if self.command in ('POST', 'PUT'):
+                try:
+                    upload_bytes = int(self.headers.get('Content-Length', 0))
+                except (TypeError, ValueError):
+                    pass
+            _record_request(self.command, endpoint, self._status_code or 0,
+                            time.perf_counter() - self._request_start, upload_bytes)
+
+    def translate_path(self, path):
+        # /vendor/ 始终映射到插件目录下的 vendor/，即使查看器页面位于其它目录
+        if urllib.parse.urlparse(path).path.startswith('/vendor/'):
+            directory = self.directory
+            self.directory = str(PLUGIN_DIR)
+            try:
+                return super().translate_path(path)
+            finally:
+                self.directory = directory
+        return super().translate_path(path)
+
+    def _accepted_encodings(self):
+        accepted = set()
+        for part in (self.headers.get('Accept-Encoding') or '').split(','):
+            name, _, params = part.strip().partition(';')
+            if name and params.replace(' ', '') not in ('q=0', 'q=0.0'):
+                accepted.add(name.lower())
+        return accepted
+
+    def send_head(self):
+        """
+        静态文件：强 ETag + If-None-Match(304)、Cache-Control，
+        按 Accept-Encoding 优先提供 .br/.gz 预压缩文件，否则对文本类资源动态 gzip（结果缓存）
+        """
+        path = self.translate_path(self.path)
+        url_path = urllib.parse.urlparse(self.path).path
+        if os.path.isdir(path):
+            return super().send_head()
+        if not os.path.isfile(path):
+            return super().send_head()
+        try:
+            st = os.stat(path)
+        except OSError:
+            return super().send_head()
+        ctype = self.guess_type(path)
+        accepted = self._accepted_encodings()
+        encoding = None
+        body = None
+        for name, suffix in _PRECOMPRESSED_VARIANTS:
+            variant = path + suffix
+            if name in accepted and os.path.isfile(variant) and os.stat(variant).st_mtime_ns >= st.st_mtime_ns:
+                encoding = name
+                body = open(variant, 'rb')
+                length = os.fstat(body.fileno()).st_size
+                break
+        if body is None and 'gzip' in accepted and ctype.startswith(_COMPRESSIBLE_TYPES) \
+                and st.st_size <= _DYNAMIC_GZIP_MAX_BYTES:
+            data = _static_gzip(path, st)
+            encoding = 'gzip'
+            body = io.BytesIO(data)
+            length = len(data)
+
+        etag = '"%s%s"' % (_static_etag(path, st), '-' + encoding if encoding else '')
+        # 带版本号的 vendor 路径（如 /vendor/three@0.128.0/...）内容不可变；其余文件每次都重新验证（命中时返回 304）
+        cache_control = 'public, max-age=31536000, immutable' if _is_versioned_vendor_path(url_path) else 'no-cache'
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match and (if_none_match.strip() == '*' or etag in [t.strip() for t in if_none_match.split(',')]):
+            if body is not None:
+                body.close()
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', cache_control)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return None
+
+        if body is None:
+            body = open(path, 'rb')
+            length = st.st_size
+        self.send_response(200)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(length))
+        self.send_header('Last-Modified', self.date_time_string(int(st.st_mtime)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', cache_control)
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        return body
+
+    def _send_bytes(self, code, body=b'', content_type='text/plain; charset=utf-8'):
+        try:
+            self.send_response(code)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+        except Exception:
+            self.close_connection = True
+
+    def _send_json(self, obj):
+        self._send_bytes(200, json.dumps(obj).encode('utf-8'), 'application/json')
+
+    def _read_chunks(self, length):
+        """按固定大小分块读取请求体，避免一次性把整个上传读入内存"""
+        remaining = length
+        while remaining > 0:
+            chunk = self.rfile.read(min(UPLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                raise ConnectionError("上传数据不完整")
+            remaining -= len(chunk)
+            yield chunk
+
+    def do_GET(self):
+        # 支持 /next_command?wait=秒 用于前端长轮询获取下一个 token
+        parsed = urllib.parse.urlparse(self.path)
+        if parsed.path == '/models':
+            return self._send_model_list(parsed)
+        if parsed.path.startswith('/models/'):
+            return self._send_model_file()
+        if parsed.path == '/metrics':
+            return self._send_bytes(200, _metrics.render().encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8')
+        if parsed.path != '/next_command':
+            return super().do_GET()
+        qs = urllib.parse.parse_qs(parsed.query)
+        try:
+            wait = float(qs.get('wait', ['0'])[0])
+        except ValueError:
+            wait = 0.0
+        wait = max(0.0, min(wait, NEXT_COMMAND_MAX_WAIT))
+        # 每个查看器页面以 viewer 参数标识自己的会话（旧页面没有该参数时共用默认会话）
+        viewer_id = qs.get('viewer', [''])[0][:64] or 'default'
+        if qs.get('heartbeat', [''])[0] == '1':
+            # 只刷新会话心跳（序列截图期间），不取命令
+            _viewer_sessions.touch(viewer_id)
+            return self._send_json({})
+        command = _viewer_sessions.poll(viewer_id, wait)
+        self._send_json(command or {})
+
+    def do_HEAD(self):
+        if urllib.parse.urlparse(self.path).path.startswith('/models/'):
+            return self._send_model_file(head=True)
+        return super().do_HEAD()
+
+    def _send_model_list(self, parsed):
+        qs = urllib.parse.parse_qs(parsed.query)
+        self._send_json({'models': _list_models(qs.get('root', [None])[0])})
+
+    def _send_model_file(self, head=False):
+        """提供模型文件，支持单段 Range（206）；正文通过 socket.sendfile 零拷贝发送（平台不支持时自动回退）"""
+        parsed = urllib.parse.urlparse(self.path)
+        full_path = _resolve_model_path(parsed.path)
+        content_type = None
+        lod = urllib.parse.parse_qs(parsed.query).get('lod', [None])[0]
+        if full_path and lod is not None and full_path.lower().endswith(MESH_LOD_EXTENSIONS):
+            # ?lod=info 返回各级 LOD 信息，?lod=N 返回预处理后的量化 GLB
+            try:
+                from . import mesh_optimize
+                if lod == 'info':
+                    meta = mesh_optimize.get_mesh_lods(full_path)
+                    levels = [dict(level, url=f"{parsed.path}?lod={level['lod']}") for level in meta['levels']]
+                    self._send_json({'source_triangles': meta['source_triangles'], 'levels': levels})
+                    return
+                full_path = mesh_optimize.get_mesh_lod_file(full_path, lod)
+                content_type = 'model/gltf-binary'
+            except (ImportError, ValueError) as e:
+                self._send_bytes(400, str(e).encode('utf-8', errors='ignore'))
+                return
+            except Exception as e:
+                print(f"网格预处理失败: {e}")
+                self._send_bytes(500, str(e).encode('utf-8', errors='ignore'))
+                return
+        try:
+            f = open(full_path, 'rb') if full_path else None
+        except OSError:
+            f = None
+        if f is None:
+            self._send_bytes(404)
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            size = st.st_size
+            byte_range = _parse_byte_range(self.headers.get('Range'), size)
+            if byte_range is False:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            start, end = byte_range or (0, size - 1)
+            count = max(0, end - start + 1)
+            self.send_response(206 if byte_range else 200)
+            self.send_header('Content-Type', content_type or self.guess_type(full_path))
+            self.send_header('Content-Length', str(count))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('ETag', f'"{st.st_mtime_ns:x}-{size:x}"')
+            self.send_header('Last-Modified', self.date_time_string(int(st.st_mtime)))
+            self.send_header('Cache-Control', 'no-cache')
+            if byte_range:
+                self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            self.end_headers()
+            if head or count == 0:
+                return
+            try:
+                self.connection.sendfile(f, start, count)
+            except (BrokenPipeError, ConnectionResetError):
+                # 浏览器取消了下载（例如切换了模型）
+                self.close_connection = True
+
+    def do_POST(self):
+        # 处理 /upload_screenshot 与 /upload_sequence
+        parsed = urllib.parse.urlparse(self.path)
+        if parsed.path == '/upload_sequence':
+            return self._receive_sequence(parsed)
+        if parsed.path != '/upload_screenshot':
+            # 请求体未读取，无法继续复用该连接
+            self.close_connection = True
+            self._send_bytes(404)
+            return
+        qs = urllib.parse.parse_qs(parsed.query)
+        token = qs.get('token', [''])[0]
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except Exception:
+            length = 0
+        if length <= 0:
+            # 空上传（或缺少 / 无效的 Content-Length）：不能覆盖 image.png，也不能当作截图结果交给等待中的节点；
+            # 没有可信的长度时无法跳过请求体，关闭连接
+            self.close_connection = self.headers.get('Content-Length', '').strip() != '0'
+            self._send_bytes(400, b'empty upload')
+            return
+        content_type = (self.headers.get('Content-Type') or '').split(';', 1)[0].strip().lower()
+        suffix = _BINARY_UPLOAD_TYPES.get(content_type)
+        if _screenshot_store.is_expected(token):
+            # 有截图节点在等待：结果只保存在按 token 隔离的内存存储中，不经过磁盘
+            try:
+                data = self._read_upload_bytes(length, suffix)
+            except ValueError:
+                self._send_bytes(400)
+                return
+            except Exception as e:
+                self.close_connection = True
+                self._send_bytes(500, str(e).encode('utf-8', errors='ignore'))
+                return
+            _screenshot_store.put(token, data)
+            _viewer_sessions.complete(token)
+            self._send_bytes(200, b'OK')
+            return
+        # 手动保存（查看器的“保存到服务器”）：先写入临时文件，再原子替换为固定文件 image.png / image.webp
+        tmpf = tempfile.NamedTemporaryFile(delete=False, suffix='.upload', dir=str(PLUGIN_DIR))
+        try:
+            if suffix:
+                # 二进制上传（canvas.toBlob）：直接从 rfile 分块流式写入临时文件
+                for chunk in self._read_chunks(length):
+                    tmpf.write(chunk)
+            else:
+                data, suffix = self._read_data_url(length)
+                tmpf.write(data)
+            tmpf.close()
+            target_path = PLUGIN_DIR / ('image' + suffix)
+            try:
+                # 原子替换（Windows/Unix 都支持）
+                os.replace(tmpf.name, str(target_path))
+            except Exception:
+                # 备用方案
+                import shutil as _shutil
+                _shutil.move(tmpf.name, str(target_path))
+            # 只保留最新一次截图，避免同一目录里同时存在 image.png 与 image.webp
+            for stale_suffix in set(_BINARY_UPLOAD_TYPES.values()) - {suffix}:
+                try:
+                    os.unlink(str(PLUGIN_DIR / ('image' + stale_suffix)))
+                except OSError:
+                    pass
+            path = str(target_path)
+        except ValueError:
+            self._discard_upload(tmpf)
+            self._send_bytes(400)
+            return
+        except Exception as _write_err:
+            # 清理临时文件（如果存在）并返回错误；请求体可能未读完，关闭连接
+            self._discard_upload(tmpf)
+            self.close_connection = True
+            self._send_bytes(500, str(_write_err).encode('utf-8', errors='ignore'))
+            return
+        self._send_bytes(200, b'OK')
+        print(f"[3DViewer DEBUG] Saved uploaded screenshot to {path}")
+
+    def _read_data_url(self, length):
+        """兼容旧的 JSON { dataUrl: 'data:image/png;base64,...' } 上传，返回 (图像字节, 扩展名)"""
+        body = b''.join(self._read_chunks(length)).decode('utf-8', errors='ignore')
+        dataurl = None
+        try:
+            j = json.loads(body)
+            dataurl = j.get('dataUrl') or j.get('dataurl') or j.get('data')
+        except Exception:
+            dataurl = body.strip()
+        if not dataurl or not dataurl.startswith('data:image'):
+            raise ValueError("缺少 dataUrl")
+        header, b64 = dataurl.split(',', 1)
+        suffix = '.webp' if header.startswith('data:image/webp') else '.png'
+        return base64.b64decode(b64), suffix
+
+    def _read_upload_bytes(self, length, suffix):
+        """把上传读入内存（二进制或 dataURL），返回图像字节"""
+        if suffix:
+            data = bytearray()
+            for chunk in self._read_chunks(length):
+                data += chunk
+            return bytes(data)
+        return self._read_data_url(length)[0]
+
+    def _receive_sequence(self, parsed):
+        """序列截图：边接收边解码进预分配的批次，整个序列只有一次请求"""
+        token = urllib.parse.parse_qs(parsed.query).get('token', [''])[0]
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except Exception:
+            length = 0
+        if not _sequence_store.is_expected(token):
+            self.close_connection = True
+            self._send_bytes(404, b'unknown token')
+            return
+        remaining = [length]
+
+        def read_into(view):
+            while len(view):
+                if remaining[0] <= 0:
+                    raise ConnectionError("上传数据不完整")
+                n = self.rfile.readinto(view[:min(len(view), remaining[0])])
+                if not n:
+                    raise ConnectionError("上传数据不完整")
+                remaining[0] -= n
+                view = view[n:]
+
+        try:
+            _sequence_store.receive(token, read_into, length)
+        except Exception as e:
+            self.close_connection = True
+            self._send_bytes(400, str(e).encode('utf-8', errors='ignore'))
+            return
+        finally:
+            _viewer_sessions.complete(token)
+        # 丢弃多余的尾部数据，保持连接可复用
+        for _ in self._read_chunks(remaining[0]):
+            pass
+        self._send_bytes(200, b'OK')
+
+    @staticmethod
+    def _discard_upload(tmpf):
+        try:
+            tmpf.close()
+            if os.path.exists(tmpf.name):
+                os.unlink(tmpf.name)
+        except Exception:
+            pass
+
+
+class _IdleConnections:
+    """
+    空闲 keep-alive 连接的等待者：一个线程用选择器等待所有空闲连接，某个连接可读（下一个请求到达
+    或客户端关闭）时交回服务器的线程池处理；空闲超过 timeout 的连接直接关闭。
+    注册在选择器线程中完成（其它线程经队列 + 唤醒套接字提交），选择器只由该线程访问
+    """
+
+    def __init__(self, server, timeout):
+        self._server = server
+        self._timeout = timeout
+        self._selector = selectors.DefaultSelector()
+        self._incoming = deque()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._closed = False
+        self._count = 0
+        self._thread = threading.Thread(target=self._run, name="bb3d-http-idle", daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        return self._count
+
+    def park(self, sock, client_address):
+        self._incoming.append((sock, client_address))
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b'\0')
+        except OSError:
+            # 唤醒缓冲区已满时选择器线程本来就会醒来
+            pass
+
+    def _run(self):
+        while not self._closed:
+            events = self._selector.select(timeout=1.0)
+            now = time.monotonic()
+            for key, _ in events:
+                if key.data is None:
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except OSError:
+                        pass
+                    continue
+                self._selector.unregister(key.fileobj)
+                self._server.resume_connection(key.fileobj, key.data[0])
+            while self._incoming:
+                sock, client_address = self._incoming.popleft()
+                try:
+                    self._selector.register(sock, selectors.EVENT_READ, (client_address, now + self._timeout))
+                except (ValueError, OSError):
+                    # 连接已被关闭
+                    self._server.shutdown_request(sock)
+            expired = [key for key in self._selector.get_map().values()
+                       if key.data is not None and key.data[1] <= now]
+            for key in expired:
+                self._selector.unregister(key.fileobj)
+                self._server.shutdown_request(key.fileobj)
+            self._count = len(self._selector.get_map()) - 1
+        for key in list(self._selector.get_map().values()):
+            if key.data is not None:
+                self._server.shutdown_request(key.fileobj)
+        while self._incoming:
+            self._server.shutdown_request(self._incoming.popleft()[0])
+        self._selector.close()
+        self._wake_r.close()
+        self._wake_w.close()
+
+    def close(self):
+        self._closed = True
+        self._wake()
+
+
+class _PooledHTTPServer(http.server.HTTPServer):
+    """
+    查看器 HTTP 服务器：每个请求交给固定大小的线程池处理，大文件上传不会阻塞轮询与静态资源请求，
+    线程数也不会随连接数无限增长。keep-alive 连接在两次请求之间由 _IdleConnections 等待，
+    不占用工作线程，因此打开的连接数不受线程池大小限制，只有同时处理中的请求（含长轮询）受限
+    """
+    allow_reuse_address = True
+
+    def __init__(self, server_address, handler_class, max_workers=VIEWER_MAX_WORKERS):
+        super().__init__(server_address, handler_class)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bb3d-http")
+        self._idle = _IdleConnections(self, VIEWER_KEEPALIVE_TIMEOUT)
+
+    def process_request(self, request, client_address):
+        try:
+            self._pool.submit(self._process_request_worker, request, client_address)
+        except RuntimeError:
+            # 线程池已关闭（服务器正在停止）
+            self.shutdown_request(request)
+
+    resume_connection = process_request
+
+    def park_connection(self, request, client_address):
+        self._idle.park(request, client_address)
+
+    def idle_connections(self):
+        return len(self._idle)
+
+    def finish_request(self, request, client_address):
+        return self.RequestHandlerClass(request, client_address, self)
+
+    def _process_request_worker(self, request, client_address):
+        handler = None
+        try:
+            handler = self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            # 已交给空闲连接选择器的连接不能在这里关闭
+            if not getattr(handler, 'parked', False):
+                self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._idle.close()
+        self._pool.shutdown(wait=False)
+
+
+# 进程级查看器服务器注册表：port -> {'server', 'thread', 'root'}
+_viewer_servers = {}
+_viewer_servers_lock = threading.Lock()
+
+
+def _ensure_viewer_server(port, root):
+    """
+    返回在 port 上以 root 为静态文件根目录运行的服务器（幂等，按需启动）
+
+    同一端口已在服务同一目录时直接复用；根目录不同则先停止旧服务器再重新绑定。
+    静态文件通过 handler 的 directory 参数提供，不修改进程工作目录。
+
+    Returns:
+        (server, started): started 表示本次是否新启动了服务器
+    Raises:
+        OSError: 端口无法绑定
+    """
+    root = str(Path(root).resolve())
+    with _viewer_servers_lock:
+        running = _viewer_servers.get(port)
+        if running is not None:
+            if running['root'] == root and running['thread'].is_alive():
+                return running['server'], False
+            _stop_viewer_server_locked(port)
+        handler = functools.partial(QuietHTTPRequestHandler, directory=root)
+        server = _PooledHTTPServer((VIEWER_HOST, port), handler)
+        if VIEWER_HOST not in ('127.0.0.1', 'localhost', '::1'):
+            print(f"🔵BB 查看器服务器监听 {VIEWER_HOST}:{port}（无认证，局域网内可访问模型文件）")
+        # 守护线程，随进程退出
+        thread = threading.Thread(target=server.serve_forever, name=f"bb3d-viewer-{port}", daemon=True)
+        thread.start()
+        _viewer_servers[port] = {'server': server, 'thread': thread, 'root': root}
+        return server, True
+
+
+def _stop_viewer_server_locked(port):
+    running = _viewer_servers.pop(port, None)
+    if running is None:
+        return False
+    try:
+        running['server'].shutdown()
+    finally:
+        running['server'].server_close()
+    return True
+
+
+def shutdown_viewer_server(port=None):
+    """停止指定端口（默认全部）的查看器服务器，返回停止的数量"""
+    with _viewer_servers_lock:
+        ports = list(_viewer_servers) if port is None else [port]
+        return sum(1 for p in ports if _stop_viewer_server_locked(p))
+
+
+atexit.register(shutdown_viewer_server)
+
+
+#
+# 截图：让已打开的查看器渲染并上传截图，直接在内存中解码为 IMAGE
+#
+def _decode_screenshot_batch(datas):
+    """把内存中的截图字节解码为 [N,H,W,3] float32 批次（尺寸以第一张为准，其余居中裁剪缩放）"""
+    from .image_io import _fit_center
+    with Image.open(io.BytesIO(datas[0])) as first:
+        width, height = first.size
+    images = np.empty((len(datas), height, width, 3), dtype=np.float32)
+    for index, data in enumerate(datas):
+        with Image.open(io.BytesIO(data)) as i:
+            rgb = i.convert("RGB")
+            if rgb.size != (width, height):
+                rgb = _fit_center(rgb, width, height)
+            np.multiply(np.asarray(rgb), 1.0 / 255.0, out=images[index], casting='unsafe')
+    return images
+
+
+def _capture_viewer_images(cameras, timeout):
+    """
+    为每个相机参数排队一条截图命令，等待查看器上传后从内存解码
+
+    Args:
+        cameras: 列表，元素为 None（使用当前视角）或 {'azimuth': 度, 'elevation': 度}
+        timeout: 等待全部截图的总超时（秒）
+
+    Returns:
+        numpy.ndarray: [N,H,W,3] float32，顺序与 cameras 一致
+    """
+    tokens = [uuid.uuid4().hex for _ in cameras]
+    for token in tokens:
+        _screenshot_store.expect(token)
+    try:
+        for token, camera in zip(tokens, cameras):
+            _queue_capture_command(token, camera)
+        deadline = time.monotonic() + timeout
+        datas = []
+        for token in tokens:
+            data = _screenshot_store.wait(token, max(0.0, deadline - time.monotonic()))
+            if data is None:
+                raise TimeoutError(f"等待查看器截图超时（{timeout}s，已收到 {len(datas)}/{len(tokens)} 张）：请确认查看器页面已打开")
+            datas.append(data)
+    finally:
+        for token in tokens:
+            _screenshot_store.discard(token)
+        # 超时或出错时，移除查看器尚未完成的命令
+        _viewer_sessions.cancel(tokens)
+    return _decode_screenshot_batch(datas)
+
+
+def _capture_viewer_sequence(cameras, fmt, timeout):
+    """
+    让一个查看器按相机路径依次渲染并在一次上传中回传全部帧
+
+    Returns:
+        numpy.ndarray: [N,H,W,3] float32，顺序与 cameras 一致
+    """
+    token = uuid.uuid4().hex
+    _sequence_store.expect(token, len(cameras))
+    try:
+        start = time.perf_counter()
+        # 渲染与上传整条序列期间页面不轮询：在节点超时之前不把命令重新分派给其它页面
+        _viewer_sessions.submit({'token': token, 'sequence': cameras, 'format': fmt},
+                                deadline=time.monotonic() + timeout)
+        entry = _sequence_store.wait(token, timeout)
+        if entry is None:
+            raise TimeoutError(f"等待查看器序列截图超时（{timeout}s）：请确认查看器页面已打开")
+        elapsed = time.perf_counter() - start
+        print(f"序列截图完成: {entry['frames']} 帧, 总计 {elapsed:.2f}s（{entry['frames'] / max(elapsed, 1e-6):.1f} 帧/秒）, "
+              f"接收解码 {entry['seconds']:.2f}s")
+        return entry['batch']
+    finally:
+        _sequence_store.discard(token)
+        _viewer_sessions.cancel([token])
+
+
+# 推送到查看器的网格 GLB 存放目录（位于插件目录下，可通过 /models/plugin/... 访问）
+MESH_PUSH_DIR = PLUGIN_DIR / "cache" / "meshes" / "pushed"
+
+
+def _push_mesh_to_viewer(mesh, name):
+    """把 MESH 写成 GLB 并通知已打开的查看器加载，返回模型 URL"""
+    from .mesh_optimize import write_glb
+    data = write_glb(mesh.vertices, mesh.faces, mesh.vertex_normals)
+    MESH_PUSH_DIR.mkdir(parents=True, exist_ok=True)
+    path = MESH_PUSH_DIR / f"{hashlib.sha1(data).hexdigest()[:16]}.glb"
+    if not path.exists():
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    url = _model_url(str(path))
+    _queue_model_command(url, name)
+    return url